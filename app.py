@@ -1,9 +1,13 @@
+import asyncio
+import functools
 import math
 import threading
-import time
 import os
-from queue import Queue
+import uuid
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
 import flet as ft
+import flet.canvas as cv
 from flet import (
     ButtonStyle,
     Column,
@@ -28,20 +32,45 @@ from flet import (
     MainAxisAlignment,
     CrossAxisAlignment,
     TextField,
+    Dropdown,
+    dropdown,
 )
 from flet import Icons, Colors
-import cv2
-import numpy as np
-from PIL import Image as PILImage
 import io
 import base64
-import tifffile
-from utils.config import NUM_WORKERS
-import concurrent.futures
-import multiprocessing
-import numpy as np
-import threading
-from queue import Queue
+import hashlib
+from utils.config import (
+    COLORMAPS,
+    FRAME_TRANSPORT,
+    NUM_WORKERS,
+    PLAYBACK_MODES,
+    PLAYBACK_STEPS,
+    TEMPORAL_FILTERS,
+    VIDEO_EXTENSIONS,
+)
+from utils.shared_cache import shared_decode_cache
+
+# cv2 / tifffile / numpy / PIL はウィンドウ表示後に読み込む（preload_codec_modules参照）
+
+# ファイル選択ダイアログで選択できる拡張子
+SUPPORTED_EXTENSIONS = ["tif", "tiff", *VIDEO_EXTENSIONS]
+
+
+def encode_png(img):
+    """RGB画像をPNGのバイト列に変換"""
+    from PIL import Image as PILImage
+
+    # NumPy配列をPIL画像に変換
+    pil_img = PILImage.fromarray(img)
+
+    with io.BytesIO() as output:
+        pil_img.save(output, format="PNG")
+        return output.getvalue()
+
+
+def encode_png_base64(img):
+    """RGB画像をbase64エンコードしたPNG文字列に変換（fletのイメージとして表示）"""
+    return base64.b64encode(encode_png(img)).decode("utf-8")
 
 
 # アプリケーション状態を管理するクラス
@@ -86,6 +115,119 @@ class AppState:
         self.page.update()
 
 
+# 主ファイルと同期して再生する比較用スタック
+class ComparePane:
+    def __init__(self, file_path, session_id):
+        self.file_path = file_path
+        # 共有キャッシュではペインごとに別のセッションとして参照する（主画面と同じ
+        # ファイルを開いていても、ペインを閉じたときに主画面の参照が外れないように）
+        self.session_id = session_id
+        self.file_key = None  # 共有キャッシュのキー
+        self.frames = []
+        self.frame_count = 0
+        # ペインごとの表示範囲（ガンマ/カラーマップは主画面に合わせる）
+        self.display_lut = None
+
+    def frame(self, frame_idx):
+        """主ファイルのフレーム番号に対応するフレーム（短いスタックは最終フレームで止める）"""
+        return self.frames[min(frame_idx, self.frame_count - 1)]
+
+
+class TaskDialog:
+    """
+    進捗バーと状態表示を持ち、処理をバックグラウンドで実行するダイアログ
+
+    投影・ドリフト補正・キモグラフ・エクスポートで共通の、実行中のボタンの無効化・
+    進捗の表示・エラーの表示・閉じたときの中断をまとめる。
+    """
+
+    def __init__(
+        self, page, title, controls, action_label, on_action, footer=(), on_close=None
+    ):
+        """
+        初期化
+
+        Args:
+            page: ダイアログを表示するページ
+            title: ダイアログのタイトル
+            controls: 進捗バーの上に並べる入力欄などのコントロール
+            action_label: 実行ボタンのラベル
+            on_action: 実行ボタンが押されたときに呼ぶ関数（引数なし）
+            footer: 状態表示の下に並べる結果表示などのコントロール
+            on_close: ダイアログが閉じられたときに呼ぶ関数（引数なし）
+        """
+        self.page = page
+        self.on_close = on_close
+        self.progress = ProgressBar(value=0, width=400, color="#2196F3", visible=False)
+        self.status_text = Text("", color="#E0E0E0")
+        # セットされると実行中の処理を中断する
+        self.stop_event = threading.Event()
+        self.action_button = ft.TextButton(action_label, on_click=lambda _: on_action())
+        self.dialog = ft.AlertDialog(
+            title=Text(title),
+            content=Column(
+                [*controls, self.progress, self.status_text, *footer], tight=True
+            ),
+            actions=[
+                self.action_button,
+                ft.TextButton("閉じる", on_click=lambda _: self.close()),
+            ],
+            on_dismiss=lambda _: self._stop(),
+        )
+
+    def open(self):
+        self.page.open(self.dialog)
+
+    def close(self):
+        self.page.close(self.dialog)
+        self._stop()
+
+    def _stop(self):
+        self.stop_event.set()
+        if self.on_close:
+            self.on_close()
+
+    def set_status(self, text):
+        """状態表示を更新する"""
+        self.status_text.value = text
+        self.page.update()
+
+    def start(self, work, done, running_text="計算中..."):
+        """
+        処理をバックグラウンドで開始する
+
+        Args:
+            work: work(progress_callback) の形で呼ぶ処理。結果を返す（中断された場合は None）
+            done: 結果を受け取ってUIに反映する関数（エラー・中断の場合は呼ばない）
+            running_text: 実行中に表示する文字列
+        """
+        self.action_button.disabled = True
+        self.progress.value = 0
+        self.progress.visible = True
+        self.status_text.value = running_text
+        self.page.update()
+        threading.Thread(target=self._run, args=(work, done), daemon=True).start()
+
+    def _run(self, work, done):
+        def on_progress(value):
+            self.progress.value = value
+            self.page.update()
+
+        try:
+            result = work(on_progress)
+        except Exception as e:
+            self.status_text.value = f"エラー: {str(e)}"
+            result = None
+        # 閉じられたダイアログは更新しない
+        if self.stop_event.is_set():
+            return
+        if result is not None:
+            done(result)
+        self.progress.visible = False
+        self.action_button.disabled = False
+        self.page.update()
+
+
 class WindowControlButton(IconButton):
     def __init__(self, *args, icon_size: int, **kwargs):
         super().__init__(*args, icon_size=icon_size, **kwargs)
@@ -103,12 +245,23 @@ class WindowTitleBar(Container):
     HEIGHT = 30
 
     def __init__(
-        self, title: str, page: Page, app_state: AppState, on_open_file=None
+        self,
+        title: str,
+        page: Page,
+        app_state: AppState,
+        on_open_file=None,
+        analysis_actions=None,
+        on_export=None,
+        on_open_folder=None,
     ) -> None:
         super().__init__()
         self.page = page
         self.base_title = title
         self.on_open_file = on_open_file
+        self.on_open_folder = on_open_folder
+        self.on_export = on_export
+        # 解析メニューの項目: (表示名, アイコン, コールバック) のリスト
+        self.analysis_actions = analysis_actions or []
         self.app_state = app_state
 
         # 状態変更をリッスン
@@ -181,6 +334,22 @@ class WindowTitleBar(Container):
                                     self.on_open_file() if self.on_open_file else None
                                 ),
                             ),
+                            ft.PopupMenuItem(
+                                text="フォルダを開く...",
+                                icon=Icons.FOLDER_COPY,
+                                on_click=lambda _: (
+                                    self.on_open_folder()
+                                    if self.on_open_folder
+                                    else None
+                                ),
+                            ),
+                            ft.PopupMenuItem(
+                                text="エクスポート...",
+                                icon=Icons.SAVE_ALT,
+                                on_click=lambda _: (
+                                    self.on_export() if self.on_export else None
+                                ),
+                            ),
                             ft.PopupMenuItem(
                                 text="終了",
                                 icon=Icons.EXIT_TO_APP,
@@ -190,6 +359,21 @@ class WindowTitleBar(Container):
                     ),
                     padding=padding.only(left=8, right=4),  # 左右のパディングを追加
                 ),
+                Container(
+                    content=ft.PopupMenuButton(
+                        content=Text("解析", color="#E0E0E0"),
+                        items=[
+                            ft.PopupMenuItem(
+                                text=label,
+                                icon=icon,
+                                on_click=lambda _, callback=callback: callback(),
+                            )
+                            for label, icon, callback in self.analysis_actions
+                        ],
+                    ),
+                    padding=padding.only(left=4, right=4),
+                    visible=bool(self.analysis_actions),
+                ),
                 Container(
                     content=ft.PopupMenuButton(
                         content=Text("ヘルプ", color="#E0E0E0"),
@@ -282,17 +466,51 @@ class TiffPlayer:
         self.app_state = app_state
         self.frames = []
         self.frame_count = 0
+        self.frame_stats = None  # FrameStatsIndex（フレームごとの最小値/最大値/平均など）
         self.current_frame = 0
         self.is_playing = False
         self.fps = 10  # デフォルトのフレームレート
-        self.frame_queue = Queue(maxsize=30)  # フレームバッファ用キュー
-        self.preload_thread = None
-        self.play_thread = None
-        self.stop_threads = False
+        self.play_mode = "順方向"  # PLAYBACK_MODES のいずれか
+        self.play_step = 1  # 1ティックで進めるフレーム数
+        self.prefetch_depth = 8  # 再生中に先読みしておくフレーム数
+        # 表示設定が変わると増やし、それ以前に先読みした画像を破棄する
+        self.prefetch_epoch = 0
+        # 再生・シークはページのイベントループ上のタスクで行い、
+        # デコード/エンコードはこのエグゼキュータで実行する（フレーム順を保つため1スレッド）
+        self.render_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="render"
+        )
+        self.play_task = None  # 再生タスク（concurrent.futures.Future）
+        self.seek_lock = threading.Lock()
+        self.seek_target = None  # 次に表示するシーク先（連続したシークはまとめる）
+        self.seek_task = None
+        self.progress_pending = False  # 進捗表示の更新を予約済みか
+
+        # 読み込みセッション（新しいファイルを開くと前の読み込みはキャンセルされる）
+        # デコード結果はプロセス全体で共有され、同じファイルを開いた他のセッションと共用する
+        self.session_id = uuid.uuid4().hex
+        self.shared_cache = shared_decode_cache
+        self.file_key = None
+        self.load_generation = 0
+        self.load_lock = threading.RLock()
 
         # UIコンポーネント
         self.file_picker = FilePicker(on_result=self.file_picker_result)
         self.page.overlay.append(self.file_picker)
+        self.export_picker = FilePicker()
+        self.page.overlay.append(self.export_picker)
+        # 同期再生する比較用スタック（主ファイルの右側に並べて表示）
+        self.panes = []
+        self.compare_picker = FilePicker(on_result=self.compare_files_picked)
+        self.page.overlay.append(self.compare_picker)
+        # フォルダ内のファイルを順に閲覧するプレイリスト
+        self.playlist = []
+        self.playlist_index = 0
+        self.folder_picker = FilePicker(on_result=self.folder_picked)
+        self.page.overlay.append(self.folder_picker)
+        # 先読みした次のファイルの (ファイルキー, (総フレーム数, 先頭フレーム, 統計))
+        self.next_preview = None
+        self.prefetch_stop = threading.Event()
 
         self.loading_progress = ProgressBar(visible=False, width=400, color="#2196F3")
 
@@ -309,6 +527,27 @@ class TiffPlayer:
             inactive_color="#757575",
         )
 
+        # フレームごとの変化量（スライダー上のヒートストリップとイベント移動に使用）
+        self.activity = None  # ActivityIndex
+        self.activity_stop = threading.Event()
+        self.activity_strip = Image(
+            src=None, fit="fill", height=8, gapless_playback=True, visible=False
+        )
+        self.prev_event_button = IconButton(
+            Icons.KEYBOARD_ARROW_LEFT,
+            tooltip="前のイベント",
+            on_click=lambda _: self.jump_to_event(-1),
+            visible=False,
+            icon_color="#E0E0E0",
+        )
+        self.next_event_button = IconButton(
+            Icons.KEYBOARD_ARROW_RIGHT,
+            tooltip="次のイベント",
+            on_click=lambda _: self.jump_to_event(1),
+            visible=False,
+            icon_color="#E0E0E0",
+        )
+
         # フレームカウンター（テキストフィールド化）
         self.frame_counter_field = TextField(
             value="0",
@@ -359,6 +598,29 @@ class TiffPlayer:
             ),
         )
 
+        # プレイリストの前後のファイル
+        self.prev_file_button = IconButton(
+            Icons.KEYBOARD_DOUBLE_ARROW_LEFT,
+            tooltip="前のファイル",
+            on_click=lambda _: self.step_playlist(-1),
+            visible=False,
+            icon_color="#E0E0E0",
+            style=ButtonStyle(
+                overlay_color="#424242",
+            ),
+        )
+        self.next_file_button = IconButton(
+            Icons.KEYBOARD_DOUBLE_ARROW_RIGHT,
+            tooltip="次のファイル",
+            on_click=lambda _: self.step_playlist(1),
+            visible=False,
+            icon_color="#E0E0E0",
+            style=ButtonStyle(
+                overlay_color="#424242",
+            ),
+        )
+        self.playlist_text = Text("", color="#E0E0E0")
+
         # FPS調整
         self.fps_text = Text(
             "FPS: 10", visible=False, color="#E0E0E0", width=60, text_align="right"
@@ -374,6 +636,104 @@ class TiffPlayer:
             active_color="#2196F3",
             inactive_color="#757575",
         )
+        # 再生方向と間引き（早送り）
+        self.play_mode_dropdown = Dropdown(
+            value=self.play_mode,
+            options=[dropdown.Option(mode) for mode in PLAYBACK_MODES],
+            on_change=self.playback_mode_changed,
+            visible=False,
+            width=100,
+            dense=True,
+            color="#E0E0E0",
+            border_color="#424242",
+        )
+        self.play_step_dropdown = Dropdown(
+            value="1",
+            options=[dropdown.Option(str(step), f"×{step}") for step in PLAYBACK_STEPS],
+            tooltip="1ティックで進めるフレーム数",
+            on_change=self.playback_mode_changed,
+            visible=False,
+            width=90,
+            dense=True,
+            color="#E0E0E0",
+            border_color="#424242",
+        )
+        self.play_rate_text = Text("", color="#AAAAAA")
+
+        # 表示調整（ウィンドウ/レベル、ガンマ、カラーマップ）
+        self.display_lut = None  # DisplayLUT（ファイル読み込み時に作成）
+        self.level_text = Text("レベル", color="#E0E0E0")
+        self.level_slider = Slider(
+            min=0,
+            max=255,
+            value=127.5,
+            on_change=self.display_settings_changed,
+            width=160,
+            active_color="#2196F3",
+            inactive_color="#757575",
+        )
+        self.window_text = Text("ウィンドウ", color="#E0E0E0")
+        self.window_slider = Slider(
+            min=1,
+            max=255,
+            value=255,
+            on_change=self.display_settings_changed,
+            width=160,
+            active_color="#2196F3",
+            inactive_color="#757575",
+        )
+        self.gamma_text = Text("γ: 1.00", color="#E0E0E0", width=60)
+        self.gamma_slider = Slider(
+            min=0.2,
+            max=3.0,
+            value=1.0,
+            divisions=28,
+            on_change=self.display_settings_changed,
+            width=120,
+            active_color="#2196F3",
+            inactive_color="#757575",
+        )
+        self.colormap_dropdown = Dropdown(
+            value="グレー",
+            options=[dropdown.Option(name) for name in COLORMAPS],
+            on_change=self.display_settings_changed,
+            width=130,
+            dense=True,
+            color="#E0E0E0",
+            border_color="#424242",
+        )
+        # 時間方向フィルタ（ΔF/F、移動平均など）
+        self.temporal_pipeline = None  # TemporalPipeline
+        # ドリフト補正のシフト表（Noneの場合は補正しない）
+        self.drift_shifts = None
+        self.filter_dropdown = Dropdown(
+            value="なし",
+            label="フィルタ",
+            options=[dropdown.Option(name) for name in TEMPORAL_FILTERS],
+            on_change=self.temporal_filter_changed,
+            width=130,
+            dense=True,
+            color="#E0E0E0",
+            border_color="#424242",
+        )
+        self.filter_window_field = TextField(
+            value="10",
+            label="窓",
+            width=70,
+            dense=True,
+            on_submit=self.temporal_filter_changed,
+            color="#E0E0E0",
+            border_color="#424242",
+        )
+        self.auto_contrast_button = IconButton(
+            Icons.AUTO_FIX_HIGH,
+            tooltip="自動コントラスト",
+            on_click=self.auto_contrast,
+            icon_color="#E0E0E0",
+            style=ButtonStyle(
+                overlay_color="#424242",
+            ),
+        )
 
         self.image_view = Image(
             src=None,
@@ -381,6 +741,35 @@ class TiffPlayer:
             width=600,
             height=400,
         )
+        # フレーム画像をローカルHTTPで配信する場合のトークン（Noneはbase64で送る）
+        self.frame_token = None
+        if FRAME_TRANSPORT == "http":
+            from utils.frame_server import frame_server
+
+            # Webモードではブラウザがページを開いたホスト名でサーバーに接続させる
+            page_host = None
+            if getattr(page, "web", False) and getattr(page, "url", None):
+                page_host = urlparse(page.url).hostname
+            self.frame_host = frame_server.url_host(page_host)
+            if self.frame_host is None:
+                print(
+                    "フレーム配信サーバーにこのブラウザから接続できないため、"
+                    "base64で表示します（FRAME_SERVER_HOST を確認してください）"
+                )
+            else:
+                self.frame_server = frame_server
+                self.frame_token = frame_server.register(self.serve_frame)
+                # URLで配信する場合、次の画像を取得するまで前の画像を表示し続ける
+                self.image_view.gapless_playback = True
+        # キモグラフ用の線を描画するオーバーレイ（表示座標）
+        self.line_canvas = cv.Canvas(shapes=[], width=600, height=400, visible=False)
+        # 線の頂点（画像の画素座標）。Noneの場合は描画モードでない
+        self.line_points = None
+        self.image_area = ft.GestureDetector(
+            content=ft.Stack([self.image_view, self.line_canvas]),
+            on_tap_down=self.image_tapped,
+            on_secondary_tap=self.finish_line,
+        )
 
         # ファイル選択前の表示テキスト
         self.no_file_text = Text(
@@ -394,7 +783,7 @@ class TiffPlayer:
             "TIFFファイルを開く",
             icon=Icons.FOLDER_OPEN,
             on_click=lambda _: self.file_picker.pick_files(
-                allowed_extensions=["tif", "tiff"]
+                allowed_extensions=SUPPORTED_EXTENSIONS
             ),
             style=ButtonStyle(
                 color="#E0E0E0",
@@ -411,7 +800,7 @@ class TiffPlayer:
 
         self.image_container = Container(
             content=Column(
-                [self.no_file_text, self.image_view],
+                [self.no_file_text, self.image_area],
                 alignment=MainAxisAlignment.CENTER,
                 horizontal_alignment=CrossAxisAlignment.CENTER,
             ),
@@ -426,9 +815,18 @@ class TiffPlayer:
         self.control_panel = Container(
             content=Column(
                 [
-                    # 1行目: スライダー
+                    # 変化量のヒートストリップ（スライダーのつまみの可動範囲に合わせる）
+                    Container(
+                        content=self.activity_strip,
+                        padding=padding.symmetric(horizontal=24),
+                    ),
+                    # 1行目: スライダーとイベント移動
                     Row(
-                        [self.frame_slider],
+                        [
+                            self.frame_slider,
+                            self.prev_event_button,
+                            self.next_event_button,
+                        ],
                         alignment=MainAxisAlignment.START,
                     ),
                     # 2行目: FPS設定、再生コントロール、フレームカウンター
@@ -436,12 +834,25 @@ class TiffPlayer:
                         [
                             # 左: FPS設定
                             Row(
-                                [self.fps_text, self.fps_slider],
+                                [
+                                    self.fps_text,
+                                    self.fps_slider,
+                                    self.play_mode_dropdown,
+                                    self.play_step_dropdown,
+                                    self.play_rate_text,
+                                ],
                                 alignment=MainAxisAlignment.START,
                             ),
                             # 中央: 再生コントロール
                             Row(
-                                [self.prev_button, self.play_button, self.next_button],
+                                [
+                                    self.prev_file_button,
+                                    self.prev_button,
+                                    self.play_button,
+                                    self.next_button,
+                                    self.next_file_button,
+                                    self.playlist_text,
+                                ],
                                 alignment=MainAxisAlignment.CENTER,
                             ),
                             # 右: フレームカウンター
@@ -452,6 +863,22 @@ class TiffPlayer:
                         ],
                         alignment=MainAxisAlignment.SPACE_BETWEEN,
                     ),
+                    # 3行目: 表示調整
+                    Row(
+                        [
+                            self.level_text,
+                            self.level_slider,
+                            self.window_text,
+                            self.window_slider,
+                            self.gamma_text,
+                            self.gamma_slider,
+                            self.colormap_dropdown,
+                            self.auto_contrast_button,
+                            self.filter_dropdown,
+                            self.filter_window_field,
+                        ],
+                        alignment=MainAxisAlignment.START,
+                    ),
                 ],
                 spacing=5,
             ),
@@ -489,7 +916,7 @@ class TiffPlayer:
             frame_index = max(
                 0, min(frame_index, self.frame_count - 1)
             )  # 範囲内に収める
-            self.display_frame(frame_index)
+            self.request_seek(frame_index)
         except ValueError:
             # 無効な入力の場合は現在のフレーム番号に戻す
             e.control.value = str(self.current_frame + 1)
@@ -497,18 +924,9 @@ class TiffPlayer:
 
     def file_picker_result(self, e: FilePickerResultEvent):
         if e.files and len(e.files) == 1:
-            self.stop_playback()
-            file_path = e.files[0].path
-            file_name = os.path.basename(file_path)
-
-            # UIリセット
-            self.loading_progress.visible = True
-            self.file_info.value = f"ファイル: {file_name} (読み込み中...)"
-            self.no_file_text.visible = False
-            self.page.update()
-
-            # 別スレッドで読み込み
-            threading.Thread(target=self.load_tiff, args=(file_path,)).start()
+            # 単独のファイルを開いた場合はプレイリストを解除
+            self.set_playlist([])
+            self.open_file(e.files[0].path)
         else:
             # ファイル選択がキャンセルされた場合
             if not self.app_state.current_file_path:
@@ -516,75 +934,241 @@ class TiffPlayer:
                 self.image_view.visible = False
                 self.page.update()
 
-    # original
-    def load_tiff(self, file_path):
+    def open_file(self, file_path):
+        """再生を止めてファイルを開く"""
+        self.stop_playback()
+        file_name = os.path.basename(file_path)
+
+        # UIリセット
+        self.loading_progress.visible = True
+        self.file_info.value = f"ファイル: {file_name} (読み込み中...)"
+        self.no_file_text.visible = False
+        self.show_preview(file_path)
+        self.page.update()
+
+        # 読み込みセッションを開始（実行中の読み込みはキャンセルされる）
+        self.load_tiff(file_path)
+
+    def folder_picked(self, e):
+        """選択したフォルダ内の対応ファイルを名前順にプレイリストとして開く"""
+        if not e.path:
+            return
+        extensions = tuple(f".{ext}" for ext in SUPPORTED_EXTENSIONS)
+        files = sorted(
+            os.path.join(e.path, name)
+            for name in os.listdir(e.path)
+            if name.lower().endswith(extensions)
+        )
+        if not files:
+            self.page.open(ft.SnackBar(Text("対応しているファイルがありません")))
+            return
+        self.set_playlist(files)
+        self.open_file(files[0])
+
+    def set_playlist(self, files, index=0):
+        self.playlist = list(files)
+        self.playlist_index = index
+        self.playlist_text.value = (
+            f"{index + 1}/{len(self.playlist)}" if self.playlist else ""
+        )
+        for control in (self.prev_file_button, self.next_file_button):
+            control.visible = len(self.playlist) > 1
+        if not self.playlist:
+            self.cancel_prefetch()
+
+    def step_playlist(self, delta):
+        """プレイリストの前後のファイルに移る"""
+        index = self.playlist_index + delta
+        if not 0 <= index < len(self.playlist):
+            return
+        self.set_playlist(self.playlist, index)
+        self.open_file(self.playlist[index])
+
+    def prefetch_next_file(self):
+        """
+        プレイリストの次のファイルのIFD・先頭フレーム・その統計を先読みしておく
+
+        フレーム全体は読み込まないので共有キャッシュのメモリは使わず、1スレッドで
+        読むので再生中のファイルの処理も妨げない。次のファイルに移ると、全ワーカーでの
+        読み込みが終わる前に先頭フレームを表示する。
+        """
+        self.cancel_prefetch()
+        index = self.playlist_index + 1
+        if index >= len(self.playlist):
+            return
+        stop_event = threading.Event()
+        self.prefetch_stop = stop_event
+        threading.Thread(
+            target=self._prefetch_preview,
+            args=(self.playlist[index], stop_event),
+            daemon=True,
+        ).start()
+
+    def _prefetch_preview(self, file_path, stop_event):
+        """先読みスレッド（完了したら next_preview に保持する）"""
+        from utils.shared_cache import file_key
+        from utils.tiff_loader import TiffLoader
+
         try:
-            # フレームをリセット
-            self.frames = []
-            self.frame_count = 0
+            key = file_key(file_path)
+            preview = TiffLoader(max_workers=1, keep_native=True).read_preview(
+                file_path, stop_event=stop_event
+            )
+        except Exception as e:
+            print(f"次のファイルを先読みできませんでした: {str(e)}")
+            return
+        with self.load_lock:
+            if preview is not None and not stop_event.is_set():
+                self.next_preview = (key, preview)
+
+    def cancel_prefetch(self):
+        """先読みを中断し、先読み済みの結果を破棄する"""
+        self.prefetch_stop.set()
+        with self.load_lock:
+            self.next_preview = None
+
+    def show_preview(self, file_path):
+        """先読み済みのファイルであれば、読み込みの完了を待たずに先頭フレームを表示する"""
+        from utils.shared_cache import file_key
+
+        with self.load_lock:
+            preview = self.next_preview
+        self.cancel_prefetch()
+        try:
+            if preview is None or preview[0] != file_key(file_path):
+                return
+        except OSError:
+            return
+        frame_count, frames, stats = preview[1]
+        if not frames:
+            return
 
-            # まずtifffileライブラリでTIFFを読み込む
-            try:
-                # tifffileを使って読み込み
-                with tifffile.TiffFile(file_path) as tif:
-                    total_frames = len(tif.pages)
-                    print("loading tifffile...")
-                    print(f"total frames: {total_frames}")
-                    print(f"size: {tif.pages[0].shape}")
-                    for i, page in enumerate(tif.pages):
-                        # ページを画像として読み込む
-                        img = page.asarray()
-
-                        img = self._convert_to_rgb(img)
-
-                        self.frames.append(img)
-                        self.frame_count += 1
-
-                        # 進捗更新
-                        self.loading_progress.value = (i + 1) / total_frames
-                        self.page.update()
-                    print("complete loading tifffile!")
-                # 読み込みが成功したのでUIを更新
-                self.update_ui_after_loading(file_path)
+        from utils.display_lut import DisplayLUT
+
+        lut = DisplayLUT(
+            gamma=self.gamma_slider.value, colormap=self.colormap_dropdown.value
+        )
+        if len(stats) > 0:
+            lut.set_range(*stats.auto_contrast())
+        # HTTP配信の場合もフレームサーバーにはまだ登録していないのでbase64で表示する
+        self.image_view.src_base64 = encode_png_base64(lut.apply(frames[0]))
+        self.image_view.visible = True
+        self.file_info.value = (
+            f"ファイル: {os.path.basename(file_path)} "
+            f"(読み込み中... {frame_count}フレーム)"
+        )
+
+    def load_tiff(self, file_path):
+        """新しい読み込みセッションを開始する"""
+        with self.load_lock:
+            self.load_generation += 1
+            generation = self.load_generation
+
+            # 前のファイルのフレームを即座に解放
+            self.release_frames()
+
+            self.loading_progress.value = 0
+            self.file_key = self.shared_cache.open(
+                file_path,
+                self.session_id,
+                progress_callback=functools.partial(
+                    self._on_load_progress, generation
+                ),
+                error_callback=functools.partial(self._on_load_error, generation),
+                complete_callback=functools.partial(
+                    self._on_load_complete, generation, file_path
+                ),
+            )
+
+    def release_frames(self):
+        """保持しているフレームへの参照を解放する（実体は共有キャッシュが管理）"""
+        self.frames = []
+        self.frame_count = 0
+        self.frame_stats = None
+        self.temporal_pipeline = None
+        self.drift_shifts = None
+        self.activity_stop.set()
+        self.activity = None
+        self.activity_strip.visible = False
+        self.prev_event_button.visible = False
+        self.next_event_button.visible = False
+        self.line_points = None
+        self.line_canvas.shapes = []
+        self.line_canvas.visible = False
+        for pane in self.panes:
+            self.shared_cache.release(pane.file_key, pane.session_id)
+        self.panes = []
+        self.shared_cache.release(self.file_key, self.session_id)
+        self.file_key = None
+
+    def dispose(self):
+        """セッション終了時の後始末"""
+        self.stop_playback()
+        self.render_executor.shutdown(wait=False, cancel_futures=True)
+        self.cancel_prefetch()
+        if self.frame_token is not None:
+            self.frame_server.unregister(self.frame_token)
+            self.frame_token = None
+        with self.load_lock:
+            self.load_generation += 1
+            self.release_frames()
+
+    def _on_load_progress(self, generation, progress):
+        with self.load_lock:
+            # 古いセッションの結果はUIに反映しない
+            if generation != self.load_generation:
+                return
+            self.loading_progress.value = progress
+            # 画面の更新はイベントループで行い、未処理の更新があればまとめる
+            if self.progress_pending:
                 return
-            except Exception as pil_err:
-                print(f"failed to load tiff file: {str(pil_err)}")
-                # 両方のメソッドが失敗した場合
-                raise Exception("サポートされていないTIFFフォーマットです")
+            self.progress_pending = True
+        self.page.run_task(self._flush_progress)
 
-        except Exception as e:
-            self.file_info.value = f"エラー: {str(e)}"
+    async def _flush_progress(self):
+        with self.load_lock:
+            self.progress_pending = False
+        self.page.update()
+
+    def _on_load_error(self, generation, message):
+        with self.load_lock:
+            if generation != self.load_generation:
+                return
+            self.file_info.value = f"エラー: {message}"
             self.loading_progress.visible = False
             self.no_file_text.visible = True
             self.image_view.visible = False
             self.app_state.clear_file()
             self.page.update()
 
-    def _convert_to_rgb(self, img):
-        print(f"Original data type: {img.dtype}, Shape: {img.shape}")
-
-        # For 16-bit integers
-        if img.dtype != np.uint8:
-            print("Converting image to 8-bit")
-            min_val = np.min(img)
-            max_val = np.max(img)
-            img = ((img - min_val) / (max_val - min_val) * 255).astype(np.uint8)
-
-        # Convert grayscale to RGB
-        if img.ndim == 2:
-            img_rgb = cv2.cvtColor(img, cv2.COLOR_GRAY2RGB)
-            print("Conversion successful (Grayscale to RGB)")
-        else:
-            img_rgb = img
-            print("Already in RGB format or unsupported")
-
-        return img_rgb
+    def _on_load_complete(
+        self, generation, file_path, frames, frame_count, frame_stats=None
+    ):
+        with self.load_lock:
+            if generation != self.load_generation:
+                return
+            self.frames = frames
+            self.frame_count = frame_count
+            self.frame_stats = frame_stats
+            self.update_ui_after_loading(file_path)
+            # 表示できたら次のファイルの読み込みを始める
+            self.prefetch_next_file()
 
     def update_ui_after_loading(self, file_path):
         """読み込み成功後のUI更新処理"""
         if self.frame_count > 0:
             # アプリケーション状態を更新
             self.app_state.set_file_info(file_path, self.frame_count)
+            self.file_info.value = f"ファイル: {os.path.basename(file_path)}"
+            duplicates = self.frame_stats.duplicate_count() if self.frame_stats else 0
+            if duplicates:
+                self.file_info.value += (
+                    f" (重複フレーム: {duplicates}/{self.frame_count})"
+                )
+            # 読み込めなかったページは黒いフレームで表示される
+            missing = len(self.frame_stats.missing_frames()) if self.frame_stats else 0
+            if missing:
+                self.file_info.value += f" (読み込めなかったフレーム: {missing})"
 
             # コントロールパネルの更新
             self.frame_slider.max = max(0, self.frame_count - 1)
@@ -593,20 +1177,72 @@ class TiffPlayer:
             self.frame_counter_field.value = "1"
             self.total_frames_text.value = f"/{self.frame_count}"
             self.current_frame = 0
+            self.load_drift_shifts(file_path)
+            self.build_temporal_pipeline()
+            self.reset_display_settings()
 
             # コントロールを表示
             self.show_controls()
 
             # 最初のフレームを表示
             self.display_frame(0)
+
+            # 変化量の索引はバックグラウンドで作成
+            self.start_activity_index()
+            self.log_memory_usage()
         else:
             self.file_info.value = f"エラー: フレームを読み込めませんでした"
             self.loading_progress.visible = False
             self.no_file_text.visible = True
-            self.image_view = False
+            self.image_view.visible = False
             self.app_state.clear_file()
             self.page.update()
 
+    def start_activity_index(self):
+        """フレームごとの変化量をバックグラウンドで計算し、ヒートストリップを表示する"""
+        self.activity_stop = threading.Event()
+        threading.Thread(
+            target=self._build_activity_index,
+            args=(self.frames, self.activity_stop),
+            daemon=True,
+        ).start()
+
+    def _build_activity_index(self, frames, stop_event):
+        from utils.activity import ActivityIndex, compute_activity
+
+        try:
+            scores = compute_activity(frames, stop_event=stop_event)
+        except Exception as e:
+            print(f"変化量の計算エラー: {str(e)}")
+            return
+        if scores is None:
+            return
+        activity = ActivityIndex(scores)
+        strip = encode_png_base64(activity.heat_strip())
+        with self.load_lock:
+            # 計算中に別のファイルが開かれた
+            if stop_event.is_set() or frames is not self.frames:
+                return
+            self.activity = activity
+            self.activity_strip.src_base64 = strip
+            self.activity_strip.visible = True
+            self.prev_event_button.visible = len(activity) > 0
+            self.next_event_button.visible = len(activity) > 0
+            print(f"変化の大きい区間: {len(activity)}箇所")
+            self.page.update()
+
+    def jump_to_event(self, direction):
+        """前後のイベント（変化の大きい区間の先頭）へ移動する"""
+        if self.activity is None:
+            return
+        if direction > 0:
+            frame_index = self.activity.next_event(self.current_frame)
+        else:
+            frame_index = self.activity.prev_event(self.current_frame)
+        if frame_index is not None:
+            self.stop_playback()
+            self.request_seek(frame_index)
+
     def show_controls(self):
         self.loading_progress.visible = False
         self.frame_slider.visible = True
@@ -617,190 +1253,950 @@ class TiffPlayer:
         self.next_button.visible = True
         self.fps_text.visible = True
         self.fps_slider.visible = True
+        self.play_mode_dropdown.visible = True
+        self.play_step_dropdown.visible = True
         self.no_file_text.visible = False
         self.control_panel.visible = True
         self.page.update()
 
-    def display_frame(self, frame_index):
-        print("frame index: ", frame_index)
-        print("frame count: ", self.frame_count)
-        print("frames: ", self.frames)
-        if 0 <= frame_index < self.frame_count:
-            frame = self.frames[frame_index]
+    def reset_display_settings(self):
+        """読み込んだファイルに合わせて表示調整の範囲と初期値を設定"""
+        from utils.display_lut import DisplayLUT
 
-            # NumPy配列をPIL画像に変換
-            pil_img = PILImage.fromarray(frame)
+        # 範囲と初期値はフレーム統計から求める（画素の再走査はしない）
+        if self.frame_stats is not None and len(self.frame_stats) > 0:
+            low, high = self.frame_stats.global_range()
+            initial = self.frame_stats.auto_contrast()
+        else:
+            low, high = 0.0, 255.0
+            initial = (low, high)
+        # 浮動小数点は値域が1未満のこともあるので、ウィンドウ幅の下限を値域に合わせる
+        if self.frame_count > 0 and self.frames[0].dtype.kind == "f":
+            high = max(high, low + 1e-6)
+            min_window = (high - low) / 1000
+        else:
+            high = max(high, low + 1)
+            min_window = 1
+
+        self.display_lut = DisplayLUT(
+            gamma=self.gamma_slider.value, colormap=self.colormap_dropdown.value
+        )
+        self.display_lut.set_range(*initial)
+
+        self.level_slider.min = low
+        self.level_slider.max = high
+        self.window_slider.min = min_window
+        self.window_slider.max = high - low
+        self.update_display_controls()
+
+    def fit_display_range(self, img):
+        """フィルタ適用後の画像の値域に合わせて表示範囲を設定（パーセンタイルで外れ値を除外）"""
+        import numpy as np
+        from utils.display_scale import finite_sample
+
+        # 値域とパーセンタイルは間引いた画素の有限値から求める
+        sample = finite_sample(img)
+        if sample.size == 0:
+            return
+        low, high = sample.min(), sample.max()
+        initial = np.percentile(sample, [0.35, 99.65])
+        high = max(float(high), float(low) + 1e-6)
+        self.level_slider.min = float(low)
+        self.level_slider.max = high
+        self.window_slider.min = (high - low) / 1000
+        self.window_slider.max = high - low
+        self.display_lut.set_range(float(initial[0]), float(initial[1]) + 1e-6)
+        self.update_display_controls()
+
+    def build_temporal_pipeline(self):
+        """選択中のフィルタからパイプラインを作成（「なし」の場合はNone）"""
+        try:
+            window = max(1, int(self.filter_window_field.value))
+        except ValueError:
+            window = 10
+            self.filter_window_field.value = str(window)
 
-            # PILイメージをbase64エンコードしてfletのイメージとして表示
-            with io.BytesIO() as output:
-                pil_img.save(output, format="PNG")
-                img_base64 = base64.b64encode(output.getvalue()).decode("utf-8")
+        self.temporal_pipeline = None
+        if self.filter_dropdown.value == "なし" or self.frame_count == 0:
+            return
 
-            self.image_view.visible = True
-            self.image_view.src_base64 = img_base64
-            self.current_frame = frame_index
-            self.frame_slider.value = frame_index
-            self.frame_counter_field.value = str(frame_index + 1)
+        from utils.temporal_filter import TemporalPipeline, build_stages
 
-            # アプリケーション状態を更新
-            self.app_state.set_current_frame(frame_index)
+        source = self.display_source()
+        stages = build_stages(self.filter_dropdown.value, window, source)
+        self.temporal_pipeline = TemporalPipeline(
+            stages, get_frame=lambda idx: source[idx]
+        )
 
+    def display_source(self):
+        """表示に使うフレーム列（ドリフト補正が有効な場合は補正後のビュー）"""
+        if self.drift_shifts is None:
+            return self.frames
+        from utils.registration import RegisteredFrames
+
+        return RegisteredFrames(self.frames, self.drift_shifts)
+
+    def load_drift_shifts(self, file_path):
+        """ファイルの横に保存されたシフト表があれば読み込んで補正を有効にする"""
+        from utils.registration import load_shifts
+
+        shifts = load_shifts(file_path)
+        if shifts is not None and len(shifts) == self.frame_count:
+            self.drift_shifts = shifts
+
+    def temporal_filter_changed(self, e):
+        """フィルタの種類または窓の枚数が変更されたときの処理"""
+        if self.frame_count == 0:
+            return
+        self.build_temporal_pipeline()
+        if self.temporal_pipeline is None:
+            self.reset_display_settings()
+        else:
+            self.fit_display_range(self.temporal_pipeline.get(self.current_frame))
+        self.refresh_display()
+
+    def update_display_controls(self):
+        """DisplayLUTの設定をスライダーに反映"""
+        lut = self.display_lut
+        self.level_slider.value = min(
+            max(lut.level, self.level_slider.min), self.level_slider.max
+        )
+        self.window_slider.value = min(
+            max(lut.window, self.window_slider.min), self.window_slider.max
+        )
+        self.gamma_text.value = f"γ: {lut.gamma:.2f}"
+
+    def display_settings_changed(self, e):
+        """表示調整が変更されたときの処理（LUTを作り直して現在のフレームを再表示）"""
+        if self.display_lut is None:
+            return
+        changed = self.display_lut.set(
+            level=self.level_slider.value,
+            window=self.window_slider.value,
+            gamma=self.gamma_slider.value,
+            colormap=self.colormap_dropdown.value,
+        )
+        self.gamma_text.value = f"γ: {self.display_lut.gamma:.2f}"
+        # ガンマとカラーマップは比較ペインにも適用する
+        for pane in self.loaded_panes():
+            changed |= pane.display_lut.set(
+                gamma=self.gamma_slider.value, colormap=self.colormap_dropdown.value
+            )
+        if changed:
+            self.refresh_display()
+        else:
             self.page.update()
 
-    def slider_changed(self, e):
-        frame_index = int(e.control.value)
-        self.display_frame(frame_index)
+    def refresh_display(self):
+        """設定の変更を表示に反映（再生中は先読み済みの画像を破棄して次のフレームから）"""
+        if not self.is_playing:
+            self.display_frame(self.current_frame)
+        else:
+            self.prefetch_epoch += 1
+            self.page.update()
 
-    def fps_changed(self, e):
-        self.fps = int(e.control.value)
-        self.fps_text.value = f"FPS: {self.fps}"
-        self.page.update()
+    def auto_contrast(self, e=None):
+        """現在のフレームのヒストグラムから表示範囲を自動設定"""
+        if self.display_lut is None or self.frame_stats is None:
+            return
+        self.display_lut.set_range(*self.frame_stats.auto_contrast(self.current_frame))
+        self.update_display_controls()
+        self.refresh_display()
 
-    def toggle_play(self, e=None):
-        if self.is_playing:
-            self.stop_playback()
-        else:
-            self.start_playback()
+    def display_frame(self, frame_index):
+        """フレームを呼び出し元のスレッドで描画して表示する"""
+        if 0 <= frame_index < self.frame_count:
+            self.show_frame(frame_index, self.get_display_source(frame_index))
+            self.page.update()
 
-        # 再生状態をアプリケーション状態に反映
-        self.app_state.set_playing(self.is_playing)
+    def show_frame(self, frame_index, source):
+        """描画済みのフレームを表示に反映する（page.update() は呼び出し側で行う）"""
+        self.image_view.visible = True
+        self.set_image(source)
+        self.current_frame = frame_index
+        self.frame_slider.value = frame_index
+        self.frame_counter_field.value = str(frame_index + 1)
+
+        # アプリケーション状態を更新
+        self.app_state.set_current_frame(frame_index)
+
+    def request_seek(self, frame_index):
+        """
+        フレームへのシークを要求する
+
+        描画はイベントループのタスクからエグゼキュータで行う。描画中に届いた要求は
+        最後のものだけを残すので、スライダーを速く動かしても古いフレームの描画は溜まらない。
+        """
+        if not 0 <= frame_index < self.frame_count:
+            return
+        with self.seek_lock:
+            self.seek_target = frame_index
+            if self.seek_task is not None:
+                return
+            self.seek_task = self.page.run_task(self._seek_loop)
+
+    async def _seek_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            with self.seek_lock:
+                frame_index, self.seek_target = self.seek_target, None
+                if frame_index is None or frame_index >= self.frame_count:
+                    self.seek_task = None
+                    return
+            try:
+                source = await loop.run_in_executor(
+                    self.render_executor, self.get_display_source, frame_index
+                )
+            except Exception as e:
+                print(f"シークエラー: {str(e)}")
+                continue
+            self.show_frame(frame_index, source)
+            self.page.update()
 
-    def start_playback(self):
-        if not self.is_playing and self.frame_count > 0:
-            self.is_playing = True
-            self.play_button.icon = Icons.PAUSE
-            self.stop_threads = False
+    def get_display_source(self, frame_index):
+        """Imageに渡す値（HTTP配信時はフレームのURL、それ以外はbase64文字列）"""
+        if self.frame_token is None:
+            return self.get_encoded_frame(frame_index)
+        # 同じ内容のフレームは同じURLにしてクライアント側のキャッシュも共有する
+        frame_index = self._shared_frame_index(frame_index, self._render_state()[0])
+        # 先にエンコードしてキャッシュに載せておき、サーバーはそれを返すだけにする
+        _, stamp = self.get_frame_bytes(frame_index)
+        return self.frame_server.frame_url(
+            self.frame_token, frame_index, stamp, self.frame_host
+        )
 
-            # 既存のスレッドを終了させる
-            if self.play_thread and self.play_thread.is_alive():
-                self.stop_threads = True
-                self.play_thread.join(timeout=0.5)
+    def set_image(self, value):
+        """get_display_source() の値を画像表示に設定"""
+        if self.frame_token is None:
+            self.image_view.src_base64 = value
+        else:
+            # 先読みしたプレビューはbase64で表示しているので消しておく
+            self.image_view.src_base64 = None
+            self.image_view.src = value
+
+    def _render_state(self):
+        """現在の表示設定のスナップショットと、それを表すキャッシュ用のキー"""
+        lut = self.display_lut
+        pipeline = self.temporal_pipeline
+        shifts = self.drift_shifts
+        panes = self.loaded_panes()
+        variant = (
+            lut.key if lut is not None else None,
+            pipeline.key if pipeline is not None else None,
+            # シフト表の内容で区別する（再推定した場合は別の画像になる）
+            None if shifts is None else float(shifts.sum()),
+            tuple((pane.file_key, pane.display_lut.key) for pane in panes),
+        )
+        return (lut, pipeline, self.display_source(), panes), variant
+
+    def _render_frame(self, frame_index, state):
+        """表示設定を適用したRGB画像を作成"""
+        lut, pipeline, source, panes = state
+        if pipeline is not None:
+            # 時間方向フィルタを適用（連続したフレームなら差分更新のみ）
+            img = pipeline.get(frame_index)
+        else:
+            img = source[frame_index]
+        # 元のビット深度のフレームにLUTで表示設定を適用
+        if lut is not None:
+            img = lut.apply(img)
+        if panes:
+            from utils.compose import compose_side_by_side
+
+            # 全ペインを1枚にまとめ、1回の画面更新で表示する
+            img = compose_side_by_side(
+                [img]
+                + [pane.display_lut.apply(pane.frame(frame_index)) for pane in panes]
+            )
+        return img
+
+    def _shared_frame_index(self, frame_index, state):
+        """
+        エンコード済み画像をキャッシュするフレーム番号
+
+        表示が元フレームの内容だけで決まる場合は、同じ内容のフレームを
+        最初のフレームの画像で共有する。
+        """
+        _, pipeline, source, panes = state
+        stats = self.frame_stats
+        if (
+            pipeline is not None
+            or panes
+            or source is not self.frames
+            or stats is None
+            or stats.duplicate_of is None
+        ):
+            return frame_index
+        return int(stats.duplicate_of[frame_index])
+
+    def get_encoded_frame(self, frame_index):
+        """base64エンコード済みのフレーム画像を取得（他セッションとキャッシュを共有）"""
+        state, variant = self._render_state()
+        frame_index = self._shared_frame_index(frame_index, state)
+        return self.shared_cache.get_encoded(
+            self.file_key,
+            frame_index,
+            lambda: encode_png_base64(self._render_frame(frame_index, state)),
+            self.session_id,
+            variant=variant,
+        )
 
-            if self.preload_thread and self.preload_thread.is_alive():
-                self.preload_thread.join(timeout=0.5)
+    def get_frame_bytes(self, frame_index):
+        """
+        PNGのバイト列のフレーム画像を取得（HTTP配信用）
+
+        Returns:
+            tuple: (PNGのバイト列, 表示設定を表すスタンプ)
+        """
+        state, variant = self._render_state()
+        frame_index = self._shared_frame_index(frame_index, state)
+        data = self.shared_cache.get_encoded(
+            self.file_key,
+            frame_index,
+            lambda: encode_png(self._render_frame(frame_index, state)),
+            self.session_id,
+            variant=variant + ("png",),
+        )
+        stamp = hashlib.sha1(repr((self.file_key, variant)).encode()).hexdigest()
+        return data, stamp[:16]
+
+    def serve_frame(self, frame_index, stamp):
+        """フレーム配信サーバーからの要求に応答する"""
+        if not 0 <= frame_index < self.frame_count:
+            return None
+        data, current = self.get_frame_bytes(frame_index)
+        # URLのスタンプが現在の表示設定と違う場合はキャッシュさせない
+        return data, stamp == current
+
+    def _current_tiff_path(self, feature_name):
+        """TIFFファイルを開いている場合はそのパスを返す（それ以外は通知してNone）"""
+        file_path = self.app_state.current_file_path
+        if not file_path or self.frame_count == 0:
+            return None
+        if os.path.splitext(file_path)[1].lower() not in (".tif", ".tiff"):
+            self.page.open(
+                ft.SnackBar(Text(f"{feature_name}はTIFFファイルのみ対応しています"))
+            )
+            return None
+        return file_path
+
+    def _frame_range_fields(self):
+        """開始/終了フレームの入力欄（1始まり）を作成"""
+        start_field = TextField(value="1", label="開始", width=90, dense=True)
+        end_field = TextField(
+            value=str(self.frame_count), label="終了", width=90, dense=True
+        )
+        return start_field, end_field
 
-            # キューをクリア
-            with self.frame_queue.mutex:
-                self.frame_queue.queue.clear()
+    def _parse_frame_range(self, start_field, end_field):
+        """入力欄から (start, stop) を求める（0始まり、stopは含まない）"""
+        try:
+            start = max(0, int(start_field.value) - 1)
+            stop = min(self.frame_count, int(end_field.value))
+        except ValueError:
+            raise ValueError("フレーム範囲が不正です")
+        if stop <= start:
+            raise ValueError("フレーム範囲が空です")
+        return start, stop
+
+    def show_projection_dialog(self):
+        """Z/T投影ダイアログを表示する"""
+        file_path = self._current_tiff_path("投影")
+        if file_path is None:
+            return
+
+        from utils.projection import PROJECTIONS
+
+        method_dropdown = Dropdown(
+            value="max",
+            options=[dropdown.Option(key, name) for key, name in PROJECTIONS.items()],
+            width=160,
+            dense=True,
+        )
+        start_field, end_field = self._frame_range_fields()
+        result_view = Image(
+            src=None, fit="contain", width=400, height=300, visible=False
+        )
 
-            self.stop_threads = False
+        def run():
+            try:
+                start, stop = self._parse_frame_range(start_field, end_field)
+            except ValueError as e:
+                task.set_status(str(e))
+                return
+            method = method_dropdown.value
+
+            def compute(on_progress):
+                from utils.projection import project_stack
+
+                return project_stack(
+                    file_path,
+                    method,
+                    start,
+                    stop,
+                    max_workers=NUM_WORKERS,
+                    progress_callback=on_progress,
+                    stop_event=task.stop_event,
+                )
+
+            def show(result):
+                import numpy as np
+                from utils.display_lut import DisplayLUT
+
+                # 投影結果の値域に合わせて表示
+                lut = DisplayLUT()
+                lut.set_range(float(np.nanmin(result)), float(np.nanmax(result)) + 1e-6)
+                result_view.src_base64 = encode_png_base64(lut.apply(result))
+                result_view.visible = True
+                task.status_text.value = (
+                    f"{PROJECTIONS[method]} (フレーム {start + 1}-{stop})"
+                )
+
+            task.start(compute, show)
+
+        task = TaskDialog(
+            self.page,
+            "Z/T投影",
+            [Row([method_dropdown, start_field, end_field])],
+            "実行",
+            run,
+            footer=[result_view],
+        )
+        task.open()
 
-            # フレームをプリロードするスレッド
-            self.preload_thread = threading.Thread(target=self.preload_frames)
-            self.preload_thread.daemon = True
+    def show_drift_dialog(self):
+        """ドリフト補正（位相相関によるフレーム位置合わせ）のダイアログを表示する"""
+        file_path = self.app_state.current_file_path
+        if not file_path or self.frame_count == 0:
+            return
 
-            # 再生スレッド
-            self.play_thread = threading.Thread(target=self.play_frames)
-            self.play_thread.daemon = True
+        from utils.registration import load_shifts
 
-            # スレッド開始
-            self.preload_thread.start()
-            self.play_thread.start()
+        # 推定済みのシフト表（補正を切っても保持しておく）
+        estimated = [self.drift_shifts]
+        if estimated[0] is None:
+            estimated[0] = load_shifts(file_path)
 
-            self.page.update()
+        reference_field = TextField(
+            value="1", label="参照フレーム", width=110, dense=True
+        )
+        downsample_dropdown = Dropdown(
+            value="4",
+            label="縮小率",
+            options=[dropdown.Option(str(n), f"1/{n}") for n in (1, 2, 4, 8)],
+            width=100,
+            dense=True,
+        )
+        apply_switch = ft.Switch(
+            label="補正を適用",
+            value=self.drift_shifts is not None,
+            disabled=estimated[0] is None,
+            on_change=lambda e: self.set_drift_correction(
+                estimated[0] if e.control.value else None
+            ),
+        )
 
-    def preload_frames(self):
-        """次のフレームをキューに追加するスレッド"""
-        current_idx = self.current_frame
+        def describe(shifts):
+            import numpy as np
 
-        while not self.stop_threads:
+            drift = np.hypot(shifts[:, 0], shifts[:, 1])
+            return f"最大移動量: {drift.max():.1f} px（平均 {drift.mean():.1f} px）"
+
+        def run():
             try:
-                # キューが満杯でなければフレームを追加
-                if not self.frame_queue.full():
-                    next_idx = (current_idx + 1) % self.frame_count
+                reference = int(reference_field.value) - 1
+                if not 0 <= reference < self.frame_count:
+                    raise ValueError
+            except ValueError:
+                task.set_status("参照フレームが不正です")
+                return
+            frames = self.frames
+            downsample = int(downsample_dropdown.value)
+
+            def estimate(on_progress):
+                from utils.registration import estimate_shifts
+
+                return estimate_shifts(
+                    frames,
+                    len(frames),
+                    reference=reference,
+                    downsample=downsample,
+                    max_workers=NUM_WORKERS,
+                    progress_callback=on_progress,
+                    stop_event=task.stop_event,
+                )
+
+            def apply(shifts):
+                from utils.registration import save_shifts
+
+                # 推定中に別のファイルを開いた場合は結果を使わない
+                if frames is not self.frames:
+                    return
+                # 次回ファイルを開いたときに再計算しなくて済むよう保存
+                save_shifts(file_path, shifts, reference)
+                estimated[0] = shifts
+                apply_switch.disabled = False
+                apply_switch.value = True
+                task.status_text.value = describe(shifts)
+                self.set_drift_correction(shifts)
+
+            task.start(estimate, apply, running_text="推定中...")
+
+        task = TaskDialog(
+            self.page,
+            "ドリフト補正",
+            [Row([reference_field, downsample_dropdown]), apply_switch],
+            "推定",
+            run,
+        )
+        if estimated[0] is not None:
+            task.status_text.value = describe(estimated[0])
+        task.open()
+
+    def set_drift_correction(self, shifts):
+        """ドリフト補正のシフト表を設定して表示を更新する（Noneで補正なし）"""
+        if self.frame_count == 0:
+            return
+        self.drift_shifts = shifts
+        self.build_temporal_pipeline()
+        if self.temporal_pipeline is not None:
+            self.fit_display_range(self.temporal_pipeline.get(self.current_frame))
+        self.refresh_display()
+
+    def start_line_drawing(self):
+        """キモグラフ用の線の描画を開始する"""
+        if self.frame_count == 0:
+            return
+        if self.panes:
+            self.page.open(ft.SnackBar(Text("比較表示中はキモグラフを作成できません")))
+            return
+        self.line_points = []
+        self.line_canvas.shapes = []
+        self.line_canvas.visible = True
+        self.page.open(
+            ft.SnackBar(
+                Text("クリックで線の頂点を追加し、右クリックで確定します"),
+                duration=5000,
+            )
+        )
+        self.page.update()
 
-                    # フレームとインデックスをキューに追加
-                    self.frame_queue.put((next_idx, self.frames[next_idx]))
-                    current_idx = next_idx
+    def _view_to_image(self, x, y):
+        """表示座標を画像の画素座標に変換（fit=containの余白を考慮）"""
+        height, width = self.frames[0].shape[:2]
+        scale = min(self.image_view.width / width, self.image_view.height / height)
+        left = (self.image_view.width - width * scale) / 2
+        top = (self.image_view.height - height * scale) / 2
+        return (x - left) / scale, (y - top) / scale
+
+    def image_tapped(self, e):
+        """描画モード中は画像上のクリック位置を線の頂点に追加する"""
+        if self.line_points is None:
+            return
+        self.line_points.append(self._view_to_image(e.local_x, e.local_y))
+        view_points = (
+            self.line_canvas.shapes[0].points if self.line_canvas.shapes else []
+        )
+        self.line_canvas.shapes = [
+            cv.Points(
+                [*view_points, ft.Offset(e.local_x, e.local_y)],
+                point_mode=cv.PointMode.POLYGON,
+                paint=ft.Paint(color="#FFEB3B", stroke_width=2),
+            )
+        ]
+        self.page.update()
 
-                time.sleep(0.001)  # 少し待機してCPU使用率を下げる
-            except Exception as e:
-                print(f"プリロードエラー: {str(e)}")
-                time.sleep(0.1)  # エラー時に少し待機
+    def finish_line(self, e=None):
+        """描画した線でキモグラフを作成する"""
+        if self.line_points is None or len(self.line_points) < 2:
+            return
+        points = self.line_points
+        self.line_points = None
+        self.show_kymograph_dialog(points)
+
+    def clear_line(self):
+        self.line_points = None
+        self.line_canvas.shapes = []
+        self.line_canvas.visible = False
+        self.page.update()
 
-    def play_frames(self):
-        frame_time = 1.0 / self.fps
+    def show_kymograph_dialog(self, points):
+        """線に沿った輝度の時間変化（キモグラフ）を計算して表示する"""
+        file_path = self.app_state.current_file_path
+        if self.drift_shifts is not None:
+            # ドリフト補正後の位置で取り出す
+            source = self.display_source()
+        elif os.path.splitext(file_path)[1].lower() in (".tif", ".tiff"):
+            # 線上の画素だけをファイルから読み出す
+            source = file_path
+        else:
+            source = self.frames
 
-        while not self.stop_threads and self.is_playing:
-            start_time = time.time()
+        start_field, end_field = self._frame_range_fields()
+        result_view = Image(
+            src=None, fit="contain", width=400, height=300, visible=False
+        )
 
+        def run():
             try:
-                # キューからフレームを取得（ブロックせずにタイムアウト設定）
-                next_idx, _ = self.frame_queue.get(timeout=0.5)
+                start, stop = self._parse_frame_range(start_field, end_field)
+            except ValueError as e:
+                task.set_status(str(e))
+                return
 
-                # ローカル変数にインデックスを保存（クロージャでの参照問題を回避）
-                frame_idx = next_idx
+            def compute(on_progress):
+                from utils.kymograph import extract_kymograph
+
+                return extract_kymograph(
+                    source,
+                    points,
+                    start,
+                    stop,
+                    max_workers=NUM_WORKERS,
+                    progress_callback=on_progress,
+                    stop_event=task.stop_event,
+                )
+
+            def show(result):
+                import numpy as np
+                from utils.display_lut import DisplayLUT
+
+                # 縦軸が時間、横軸が線上の位置
+                lut = DisplayLUT(colormap=self.colormap_dropdown.value)
+                lut.set_range(float(np.nanmin(result)), float(np.nanmax(result)) + 1e-6)
+                result_view.src_base64 = encode_png_base64(lut.apply(result))
+                result_view.visible = True
+                task.status_text.value = (
+                    f"線上の{result.shape[1]}点 × {result.shape[0]}フレーム"
+                )
+
+            task.start(compute, show)
+
+        task = TaskDialog(
+            self.page,
+            "キモグラフ",
+            [Row([start_field, end_field])],
+            "実行",
+            run,
+            footer=[result_view],
+            on_close=self.clear_line,
+        )
+        task.open()
+        run()
+
+    def show_export_dialog(self):
+        """フレーム範囲・間引き・ROIを指定してTIFFへ書き出すダイアログを表示する"""
+        file_path = self._current_tiff_path("エクスポート")
+        if file_path is None:
+            return
+
+        from utils.exporter import COMPRESSIONS
+
+        height, width = self.frames[0].shape[:2]
+        start_field, end_field = self._frame_range_fields()
+        step_field = TextField(value="1", label="間引き", width=90, dense=True)
+        roi_fields = [
+            TextField(value=str(value), label=label, width=90, dense=True)
+            for label, value in (("X", 0), ("Y", 0), ("幅", width), ("高さ", height))
+        ]
+        compression_dropdown = Dropdown(
+            value="なし",
+            label="圧縮",
+            options=[dropdown.Option(name) for name in COMPRESSIONS],
+            width=160,
+            dense=True,
+        )
+        drift_checkbox = ft.Checkbox(
+            label="ドリフト補正を適用",
+            value=self.drift_shifts is not None,
+            visible=self.drift_shifts is not None,
+        )
+        shifts = self.drift_shifts
 
-                # UIを直接更新（非同期なし）
-                self.current_frame = frame_idx
-                self.frame_slider.value = frame_idx
-                self.frame_counter_field.value = str(frame_idx + 1)
+        def choose_output():
+            base_name = os.path.splitext(os.path.basename(file_path))[0]
+            self.export_picker.on_result = on_output_chosen
+            self.export_picker.save_file(
+                file_name=f"{base_name}_export.tif", allowed_extensions=["tif"]
+            )
 
-                # フレーム画像を更新
-                frame = self.frames[frame_idx]
-                pil_img = PILImage.fromarray(frame)
+        def on_output_chosen(e):
+            if not e.path:
+                return
+            try:
+                start, stop = self._parse_frame_range(start_field, end_field)
+                step = max(1, int(step_field.value))
+                roi = tuple(int(field.value) for field in roi_fields)
+                if min(roi) < 0:
+                    raise ValueError("ROIには0以上の値を指定してください")
+            except ValueError as err:
+                task.set_status(str(err) or "入力値が不正です")
+                return
+            output_path = e.path
+            compression = COMPRESSIONS[compression_dropdown.value]
+            export_shifts = shifts if drift_checkbox.value else None
+
+            def export(on_progress):
+                from utils.exporter import export_stack
+
+                return export_stack(
+                    file_path,
+                    output_path,
+                    start,
+                    stop,
+                    step,
+                    roi=roi,
+                    compression=compression,
+                    shifts=export_shifts,
+                    progress_callback=on_progress,
+                    stop_event=task.stop_event,
+                )
+
+            def report(written):
+                task.status_text.value = f"{written}フレームを書き出しました: {os.path.basename(output_path)}"
+
+            task.start(export, report, running_text="書き出し中...")
+
+        task = TaskDialog(
+            self.page,
+            "エクスポート",
+            [
+                Row([start_field, end_field, step_field]),
+                Row(roi_fields),
+                compression_dropdown,
+                drift_checkbox,
+            ],
+            "保存先を選択...",
+            choose_output,
+        )
+        task.open()
+
+    def add_compare_files(self):
+        """比較用のファイルを選択する"""
+        if self.frame_count == 0:
+            return
+        self.compare_picker.pick_files(
+            allow_multiple=True, allowed_extensions=SUPPORTED_EXTENSIONS
+        )
 
-                with io.BytesIO() as output:
-                    pil_img.save(output, format="PNG")
-                    img_base64 = base64.b64encode(output.getvalue()).decode("utf-8")
+    def compare_files_picked(self, e: FilePickerResultEvent):
+        """選択したファイルを比較ペインとして開く（フレームは共有キャッシュから取得）"""
+        if not e.files:
+            return
+        with self.load_lock:
+            for f in e.files:
+                pane = ComparePane(f.path, f"{self.session_id}:{uuid.uuid4().hex}")
+                self.panes.append(pane)
+                pane.file_key = self.shared_cache.open(
+                    f.path,
+                    pane.session_id,
+                    error_callback=functools.partial(self._on_pane_error, pane),
+                    complete_callback=functools.partial(self._on_pane_loaded, pane),
+                )
+
+    def _on_pane_loaded(self, pane, frames, frame_count, frame_stats=None):
+        from utils.display_lut import DisplayLUT
+
+        with self.load_lock:
+            # 読み込み中に比較が解除された
+            if pane not in self.panes:
+                return
+            if frame_count == 0:
+                self._on_pane_error(pane, "フレームを読み込めませんでした")
+                return
+            lut = DisplayLUT(
+                gamma=self.gamma_slider.value, colormap=self.colormap_dropdown.value
+            )
+            if frame_stats is not None and len(frame_stats) > 0:
+                lut.set_range(*frame_stats.auto_contrast())
+            pane.display_lut = lut
+            pane.frames = frames
+            pane.frame_count = frame_count
+            self.refresh_display()
+        self.log_memory_usage()
+
+    def log_memory_usage(self):
+        """このセッション（比較ペインを含む）と共有キャッシュ全体のメモリ使用量を出力"""
+        sessions = [self.session_id] + [pane.session_id for pane in self.panes]
+        usage = sum(self.shared_cache.session_usage(s) for s in sessions)
+        print(
+            f"メモリ使用量: このセッション {usage / 2**20:.1f} MB / "
+            f"キャッシュ全体 {self.shared_cache.total_bytes() / 2**20:.1f} MB "
+            f"(上限 {self.shared_cache.max_bytes / 2**20:.0f} MB)"
+        )
 
-                self.image_view.src_base64 = img_base64
+    def _on_pane_error(self, pane, message):
+        with self.load_lock:
+            if pane not in self.panes:
+                return
+            self.panes.remove(pane)
+            self.shared_cache.release(pane.file_key, pane.session_id)
+            self.page.open(
+                ft.SnackBar(
+                    Text(f"{os.path.basename(pane.file_path)}: エラー: {message}")
+                )
+            )
+            self.page.update()
 
-                # アプリケーション状態を更新
-                self.app_state.set_current_frame(frame_idx)
+    def clear_compare_panes(self):
+        """比較ペインをすべて閉じる"""
+        with self.load_lock:
+            if not self.panes:
+                return
+            for pane in self.panes:
+                self.shared_cache.release(pane.file_key, pane.session_id)
+            self.panes = []
+            if self.frame_count > 0:
+                self.refresh_display()
 
-                self.page.update()  # ページを更新
+    def loaded_panes(self):
+        """読み込みが完了している比較ペイン"""
+        return [pane for pane in self.panes if pane.frame_count > 0]
 
-                # 処理時間を計算して、必要に応じて待機
-                process_time = time.time() - start_time
-                sleep_time = max(0, frame_time - process_time)
-                time.sleep(sleep_time)
+    def slider_changed(self, e):
+        frame_index = int(e.control.value)
+        self.request_seek(frame_index)
 
-            except Exception as e:
-                # キューからのタイムアウトやその他のエラー
-                print(f"再生エラー: {str(e)}")
-                time.sleep(0.1)  # エラー時に少し待機
+    def fps_changed(self, e):
+        self.fps = int(e.control.value)
+        self.fps_text.value = f"FPS: {self.fps}"
+        self.update_play_rate_text()
+        self.page.update()
 
-        # スレッド終了時にUIを更新
-        self.is_playing = False
-        self.play_button.icon = Icons.PLAY_ARROW
-        self.app_state.set_playing(False)
+    def toggle_play(self, e=None):
+        if self.is_playing:
+            self.stop_playback()
+        else:
+            self.start_playback()
+
+        # 再生状態をアプリケーション状態に反映
+        self.app_state.set_playing(self.is_playing)
+
+    def start_playback(self):
+        if not self.is_playing and self.frame_count > 0:
+            self.is_playing = True
+            self.play_button.icon = Icons.PAUSE
+            self.play_task = self.page.run_task(self._playback_loop)
+            self.page.update()
+
+    async def _playback_loop(self):
+        """
+        再生タスク
+
+        先読みタスクが次のフレームをエグゼキュータで描画・エンコードしてキューに入れ、
+        このタスクはフレーム間隔ごとに取り出して表示する。
+        比較ペインを含む全ペインの画像は先読みで1枚にまとめておくので、1ティックの画面更新は1回。
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=self.prefetch_depth)
+
+        async def prefetch():
+            # 表示するフレームだけを再生方向・間引きの順に描画する
+            epoch = self.prefetch_epoch
+            frame_idx = self.current_frame
+            direction = -1 if self.play_mode == "逆方向" else 1
+            while True:
+                if epoch != self.prefetch_epoch:
+                    # 表示設定や再生方向が変わったので現在のフレームから先読みし直す
+                    epoch = self.prefetch_epoch
+                    frame_idx = self.current_frame
+                    direction = -1 if self.play_mode == "逆方向" else 1
+                frame_idx, direction = self.next_play_index(frame_idx, direction)
+                try:
+                    source = await loop.run_in_executor(
+                        self.render_executor, self.get_display_source, frame_idx
+                    )
+                except Exception as e:
+                    print(f"プリロードエラー: {str(e)}")
+                    await asyncio.sleep(0.1)
+                    continue
+                await queue.put((epoch, frame_idx, source))
+
+        prefetch_task = asyncio.create_task(prefetch())
+        try:
+            next_tick = loop.time()
+            while True:
+                epoch, frame_idx, source = await queue.get()
+                if not self.is_playing:
+                    return
+                if epoch != self.prefetch_epoch:
+                    # 表示設定の変更前に先読みした画像は使わない
+                    continue
+                self.show_frame(frame_idx, source)
+                self.page.update()
+
+                # 描画が間に合わなかった分は取り戻そうとせず、次のティックから数え直す
+                next_tick = max(next_tick + 1.0 / self.fps, loop.time())
+                await asyncio.sleep(next_tick - loop.time())
+        finally:
+            prefetch_task.cancel()
+
+    def next_play_index(self, frame_idx, direction):
+        """
+        再生中に次に表示するフレームを求める
+
+        Args:
+            frame_idx: 現在のフレーム番号
+            direction: 進む向き（1 または -1）
+
+        Returns:
+            tuple: (次のフレーム番号, 次の向き)
+        """
+        step = self.play_step * direction
+        if self.play_mode != "往復":
+            return (frame_idx + step) % self.frame_count, direction
+
+        # 往復: 端で折り返す
+        last = self.frame_count - 1
+        if last == 0:
+            return 0, direction
+        next_idx = frame_idx + step
+        if next_idx > last:
+            return max(0, 2 * last - next_idx), -1
+        if next_idx < 0:
+            return min(last, -next_idx), 1
+        return next_idx, direction
+
+    def playback_mode_changed(self, e):
+        """再生方向・間引きが変更されたときの処理（先読みをやり直す）"""
+        self.play_mode = self.play_mode_dropdown.value
+        self.play_step = int(self.play_step_dropdown.value)
+        self.update_play_rate_text()
+        self.prefetch_epoch += 1
         self.page.update()
 
+    def update_play_rate_text(self):
+        """間引き再生では元のフレーム数に換算した速さを表示"""
+        self.play_rate_text.value = (
+            f"= {self.fps * self.play_step} fps" if self.play_step > 1 else ""
+        )
+
     def stop_playback(self):
-        """再生を停止する"""
+        """再生を停止する（再生タスクをキャンセルするだけなので待たない）"""
         if self.is_playing:
-            # スレッドを停止するフラグを設定
-            self.stop_threads = True
             self.is_playing = False
+            if self.play_task is not None:
+                self.play_task.cancel()
+                self.play_task = None
             self.play_button.icon = Icons.PLAY_ARROW
 
             # アプリケーション状態を更新
             self.app_state.set_playing(False)
+            # 再生中にエンコード済み画像が増えるので停止時に使用量を出す
+            self.log_memory_usage()
 
             # UIを即時更新
             self.page.update()
 
-            # キューをクリア（ロックを使用）
-            with self.frame_queue.mutex:
-                self.frame_queue.queue.clear()
-
-            # スレッドの終了を待機（ただし長時間ブロックしない）
-            if self.play_thread and self.play_thread.is_alive():
-                self.play_thread.join(timeout=0.5)
-
-            if self.preload_thread and self.preload_thread.is_alive():
-                self.preload_thread.join(timeout=0.5)
-
     def next_frame(self, e):
         if self.frame_count > 0:
             next_idx = (self.current_frame + 1) % self.frame_count
-            self.display_frame(next_idx)
+            self.request_seek(next_idx)
 
     def prev_frame(self, e):
         if self.frame_count > 0:
             prev_idx = (self.current_frame - 1) % self.frame_count
-            self.display_frame(prev_idx)
+            self.request_seek(prev_idx)
 
 
 class Content(Container):
@@ -838,8 +2234,37 @@ class MainWindow(Container):
             self.page,
             self.app_state,
             on_open_file=lambda: self.content_container.tiff_player.file_picker.pick_files(
-                allowed_extensions=["tif", "tiff"]
+                allowed_extensions=SUPPORTED_EXTENSIONS
             ),
+            analysis_actions=[
+                (
+                    "投影...",
+                    Icons.LAYERS,
+                    self.content_container.tiff_player.show_projection_dialog,
+                ),
+                (
+                    "ドリフト補正...",
+                    Icons.CENTER_FOCUS_STRONG,
+                    self.content_container.tiff_player.show_drift_dialog,
+                ),
+                (
+                    "キモグラフ...",
+                    Icons.TIMELINE,
+                    self.content_container.tiff_player.start_line_drawing,
+                ),
+                (
+                    "比較ファイルを追加...",
+                    Icons.VIEW_COLUMN,
+                    self.content_container.tiff_player.add_compare_files,
+                ),
+                (
+                    "比較を解除",
+                    Icons.VIEW_AGENDA,
+                    self.content_container.tiff_player.clear_compare_panes,
+                ),
+            ],
+            on_export=self.content_container.tiff_player.show_export_dialog,
+            on_open_folder=lambda: self.content_container.tiff_player.folder_picker.get_directory_path(),
         )
 
         self.content = Column(
@@ -852,6 +2277,9 @@ class MainWindow(Container):
         self.bgcolor = "#121212"  # ダークモードのバックグラウンド
         self.expand = True
 
+        # セッション終了時に共有キャッシュの参照を解放
+        page.on_close = lambda _: self.content_container.tiff_player.dispose()
+
 
 def main(page: Page):
     # Fletのテーマと設定
@@ -866,6 +2294,15 @@ def main(page: Page):
     app = MainWindow(page, window_title="TIFF動画プレーヤー")
     page.add(app)
 
+    # ウィンドウを表示してからコーデック系モジュールを読み込む
+    threading.Thread(target=preload_codec_modules, daemon=True).start()
+
+
+def preload_codec_modules():
+    """最初のファイルを開くまでに重いモジュールの読み込みを済ませておく"""
+    import utils.tiff_loader  # noqa: F401  (cv2, tifffile, numpy)
+    from PIL import Image  # noqa: F401
+
 
 if __name__ == "__main__":
     ft.app(main)
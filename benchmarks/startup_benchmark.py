@@ -0,0 +1,129 @@
+"""
+起動時間の回帰ベンチマーク
+
+ウィンドウ表示までの時間 (time-to-window) と、TIFFを開いてから最初のフレームが
+表示されるまでの時間 (time-to-first-frame) を新しいPythonプロセスで計測する。
+目標値を超えた場合は終了コード1を返す。
+
+    python benchmarks/startup_benchmark.py [--runs 5]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+# 目標値（秒）
+TIME_TO_WINDOW_TARGET = 1.0
+TIME_TO_FIRST_FRAME_TARGET = 2.0
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 計測用の子プロセスで実行するコード（Fletのウィンドウの代わりに最小限のページを使う）
+_CHILD_CODE = r"""
+import asyncio, json, sys, threading, time
+t0 = time.perf_counter()
+
+import app
+
+class HeadlessWindow:
+    maximized = False
+    def close(self):
+        pass
+
+class HeadlessPage:
+    def __init__(self):
+        self.overlay = []
+        self.window = HeadlessWindow()
+    def update(self, *args):
+        pass
+    def add(self, *controls):
+        pass
+    def run_task(self, handler, *args):
+        # Fletと同じく呼び出し元のスレッドを待たせずにコルーチンを実行する
+        threading.Thread(target=asyncio.run, args=(handler(*args),), daemon=True).start()
+
+page = HeadlessPage()
+window = app.MainWindow(page, window_title="benchmark")
+page.add(window)
+time_to_window = time.perf_counter() - t0
+eager = [m for m in ("cv2", "tifffile", "numpy", "PIL") if m in sys.modules]
+
+player = window.content_container.tiff_player
+shown = threading.Event()
+original = player.display_frame
+def display_frame(frame_index):
+    original(frame_index)
+    shown.set()
+player.display_frame = display_frame
+
+t1 = time.perf_counter()
+player.load_tiff(sys.argv[1])
+shown.wait(60)
+time_to_first_frame = time.perf_counter() - t1
+
+print(json.dumps({
+    "time_to_window": time_to_window,
+    "time_to_first_frame": time_to_first_frame,
+    "eager_imports": eager,
+}))
+"""
+
+
+def make_sample_stack(path, frames=64, height=512, width=512):
+    """計測用の16ビットTIFFスタックを作成"""
+    import numpy as np
+    import tifffile
+
+    rng = np.random.default_rng(0)
+    data = rng.integers(0, 4096, size=(frames, height, width), dtype=np.uint16)
+    tifffile.imwrite(path, data)
+
+
+def run_once(tiff_path):
+    result = subprocess.run(
+        [sys.executable, "-c", _CHILD_CODE, tiff_path],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # 最終行が計測結果（それ以前はアプリのログ出力）
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="計測回数（中央値を使用）")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tiff_path = os.path.join(tmp, "sample.tif")
+        make_sample_stack(tiff_path)
+        results = [run_once(tiff_path) for _ in range(args.runs)]
+
+    time_to_window = statistics.median(r["time_to_window"] for r in results)
+    time_to_first_frame = statistics.median(r["time_to_first_frame"] for r in results)
+    eager = sorted({m for r in results for m in r["eager_imports"]})
+
+    print(f"time-to-window:      {time_to_window:.3f}s (目標 {TIME_TO_WINDOW_TARGET}s)")
+    print(
+        f"time-to-first-frame: {time_to_first_frame:.3f}s "
+        f"(目標 {TIME_TO_FIRST_FRAME_TARGET}s)"
+    )
+    if eager:
+        print(f"ウィンドウ表示前に読み込まれたモジュール: {', '.join(eager)}")
+
+    ok = (
+        time_to_window <= TIME_TO_WINDOW_TARGET
+        and time_to_first_frame <= TIME_TO_FIRST_FRAME_TARGET
+        and not eager
+    )
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+import numpy as np
+import cv2
+
+
+def _downsampled_batch(frames, start, stop, downsample, stop_event=None):
+    """
+    フレーム範囲を間引き縮小して (枚数, h, w[, C]) の float32 配列にする
+
+    Returns:
+        np.ndarray: 縮小したフレーム。動画のデコードが中断された場合は None
+    """
+    if isinstance(frames, np.ndarray):
+        batch = frames[start:stop, ::downsample, ::downsample]
+    elif hasattr(frames, "decode_range"):
+        # 動画は再生用のキャプチャとフレームキャッシュを使わず、
+        # 区間ごとに別のキャプチャで縮小しながらデコードする
+        batch = frames.decode_range(
+            start, stop, downsample=downsample, stop_event=stop_event
+        )
+        if batch is None:
+            return None
+        if len(batch) < stop - start:
+            raise IOError(f"フレーム {start + len(batch)} をデコードできませんでした")
+    else:
+        batch = np.stack(
+            [frames[idx][::downsample, ::downsample] for idx in range(start, stop)]
+        )
+    if batch.dtype.kind != "f":
+        return batch.astype(np.float32)
+    # NaN/infの画素は0として扱う（同じ位置にあるフレーム間では差が出ない）
+    batch = batch.astype(np.float32)
+    np.nan_to_num(batch, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+    return batch
+
+
+def compute_activity(
+    frames,
+    downsample=4,
+    batch_size=256,
+    progress_callback=None,
+    stop_event=None,
+):
+    """
+    フレームごとの変化量（直前フレームとの平均絶対差）を計算する
+
+    縮小したフレームを batch_size 枚ずつまとめ、差分と平均をバッチ単位で
+    ベクトル演算する。バッチの先頭は直前のバッチの最後のフレームと比較する。
+
+    Args:
+        frames: 添字アクセスできるフレーム列（numpy配列の場合はスライスで取り出し、
+                動画のフレームソースは decode_range() で区間ごとにデコードする）
+        downsample: 縦横の間引き間隔
+        batch_size: 1回にまとめて処理するフレーム数
+        progress_callback: 進捗を通知するコールバック関数 (引数: 進捗率0.0-1.0)
+        stop_event: セットされると計算を中断するイベント
+
+    Returns:
+        np.ndarray: (フレーム数,) の float32 配列（先頭フレームは0）。中断された場合は None
+    """
+    frame_count = len(frames)
+    scores = np.zeros(frame_count, dtype=np.float32)
+    previous = None
+    for start in range(0, frame_count, batch_size):
+        if stop_event is not None and stop_event.is_set():
+            return None
+        stop = min(start + batch_size, frame_count)
+        batch = _downsampled_batch(frames, start, stop, downsample, stop_event)
+        if batch is None:
+            return None
+        if previous is not None:
+            batch = np.concatenate([previous, batch])
+        diff = np.abs(np.diff(batch, axis=0))
+        axes = tuple(range(1, diff.ndim))
+        scores[stop - len(diff) : stop] = diff.mean(axis=axes)
+        previous = batch[-1:]
+        if progress_callback:
+            progress_callback(stop / frame_count)
+    return scores
+
+
+class ActivityIndex:
+    """
+    フレームごとの変化量と、変化が大きい区間（イベント）の索引
+
+    しきい値は変化量の中央値から中央絶対偏差（MAD）の k 倍だけ上に取り、
+    しきい値を超える区間の先頭フレームをイベントとする。
+    """
+
+    def __init__(self, scores, k=5.0):
+        self.scores = scores
+        median = float(np.median(scores)) if len(scores) else 0.0
+        mad = float(np.median(np.abs(scores - median))) if len(scores) else 0.0
+        # 変化のないスタックでMADが0になる場合の下限
+        self.threshold = median + k * max(mad, 0.01 * median, 1e-6)
+        active = scores > self.threshold
+        starts = active & ~np.concatenate([[False], active[:-1]])
+        self.events = np.flatnonzero(starts)
+
+    def __len__(self):
+        return len(self.events)
+
+    def next_event(self, frame_idx):
+        """frame_idx より後の最初のイベント（なければNone）"""
+        pos = np.searchsorted(self.events, frame_idx, side="right")
+        return int(self.events[pos]) if pos < len(self.events) else None
+
+    def prev_event(self, frame_idx):
+        """frame_idx より前の最後のイベント（なければNone）"""
+        pos = np.searchsorted(self.events, frame_idx, side="left") - 1
+        return int(self.events[pos]) if pos >= 0 else None
+
+    def heat_strip(self, width=1024, height=10):
+        """
+        変化量を横方向に並べたヒートストリップ画像（RGB）を作成
+
+        1画素に複数のフレームが対応する場合は最大値を使うので、短いイベントも消えない。
+        """
+        width = max(1, min(width, len(self.scores)))
+        bounds = np.linspace(0, len(self.scores), width + 1).astype(np.int64)
+        binned = np.maximum.reduceat(self.scores, bounds[:-1])
+        # しきい値の2倍で飽和させ、イベントが明るく見えるようにする
+        scale = 255.0 / max(2 * self.threshold, 1e-6)
+        row = np.clip(binned * scale, 0, 255).astype(np.uint8)
+        strip = cv2.applyColorMap(
+            np.repeat(row[None, :], height, axis=0), cv2.COLORMAP_INFERNO
+        )
+        return cv2.cvtColor(strip, cv2.COLOR_BGR2RGB)
@@ -0,0 +1,41 @@
+import numpy as np
+import cv2
+
+# ペインの間の区切りの色（画像表示エリアの背景に合わせる）
+_GAP_COLOR = (0x1E, 0x1E, 0x1E)
+
+
+def compose_side_by_side(images, gap=4):
+    """
+    複数の表示用画像を高さを揃えて横に並べた1枚のRGB画像にする
+
+    先頭の画像の高さに合わせて他の画像を縦横比を保ったまま拡大縮小し、
+    確保済みの出力配列に直接書き込む。
+
+    Args:
+        images: (H, W) または (H, W, 3) の uint8 画像のリスト
+        gap: 画像の間の区切りの幅（画素）
+
+    Returns:
+        np.ndarray: (H, 合計の幅, 3) の uint8 画像
+    """
+    height = images[0].shape[0]
+    resized = []
+    for img in images:
+        if img.ndim == 2:
+            img = cv2.cvtColor(img, cv2.COLOR_GRAY2RGB)
+        h, w = img.shape[:2]
+        if h != height:
+            width = max(1, round(w * height / h))
+            interpolation = cv2.INTER_AREA if h > height else cv2.INTER_LINEAR
+            img = cv2.resize(img, (width, height), interpolation=interpolation)
+        resized.append(img)
+
+    total_width = sum(img.shape[1] for img in resized) + gap * (len(resized) - 1)
+    out = np.empty((height, total_width, 3), dtype=np.uint8)
+    out[:] = _GAP_COLOR
+    x = 0
+    for img in resized:
+        out[:, x : x + img.shape[1]] = img
+        x += img.shape[1] + gap
+    return out
@@ -1,5 +1,39 @@
-import multiprocessing
+import os
 
-NUM_WORKERS = min(16, multiprocessing.cpu_count() - 1)
-print(f"cpu count: {multiprocessing.cpu_count()}")
-print(f"number of workers: {NUM_WORKERS}")
+NUM_WORKERS = max(1, min(16, (os.cpu_count() or 1) - 1))
+
+# OpenCV経由で直接開く動画コンテナの拡張子
+VIDEO_EXTENSIONS = ("mp4", "avi", "mov", "mkv", "wmv")
+
+# 全セッションで共有するデコードキャッシュのメモリ上限（バイト）。参照中のファイルは解放されない
+SHARED_CACHE_MAX_BYTES = 4 * 1024**3
+
+# 表示用カラーマップ（表示名 -> cv2.COLORMAP_* の名前、Noneはグレースケール）
+COLORMAPS = {
+    "グレー": None,
+    "Viridis": "COLORMAP_VIRIDIS",
+    "Inferno": "COLORMAP_INFERNO",
+    "Magma": "COLORMAP_MAGMA",
+    "Hot": "COLORMAP_HOT",
+    "Jet": "COLORMAP_JET",
+}
+
+# 再生方向（表示名）
+PLAYBACK_MODES = ("順方向", "逆方向", "往復")
+
+# 1ティックで進めるフレーム数（2以上は表示しないフレームを読み飛ばす早送り）
+PLAYBACK_STEPS = (1, 2, 5, 10, 20, 50, 100, 500, 1000)
+
+# 時間方向フィルタ（表示名）
+TEMPORAL_FILTERS = ("なし", "背景減算", "移動平均", "移動中央値", "ΔF/F")
+
+# 表示フレームの送り方
+# "base64": Imageコントロールにbase64文字列を設定する
+# "http": ローカルHTTPサーバーから配信し、ImageにはフレームのURLだけを設定する
+FRAME_TRANSPORT = "base64"
+
+# "http" で配信するサーバーの待ち受けアドレスとポート（0は空いているポート）
+# 既定ではこのマシンからしか接続できない。Webモードで別のマシンのブラウザから開く場合は
+# "0.0.0.0" などブラウザから到達できるアドレスにする（到達できない場合はbase64で送る）
+FRAME_SERVER_HOST = "127.0.0.1"
+FRAME_SERVER_PORT = 0
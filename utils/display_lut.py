@@ -0,0 +1,119 @@
+from collections import OrderedDict
+import numpy as np
+import cv2
+from utils.config import COLORMAPS
+from utils.display_scale import scale_to_uint8
+
+# ルックアップテーブルで直接引ける型と、符号なしに写すためのオフセット
+_LUT_OFFSETS = {
+    np.dtype(np.uint8): 0,
+    np.dtype(np.uint16): 0,
+    np.dtype(np.int8): 1 << 7,
+    np.dtype(np.int16): 1 << 15,
+}
+
+
+class DisplayLUT:
+    """
+    表示時のコントラスト/明るさ・ガンマ・カラーマップをルックアップテーブルで適用する
+
+    ウィンドウ/レベルとガンマ、カラーマップから (画素値の種類数, 3) のRGBテーブルを作り、
+    設定が変わったときだけ作り直す。フレームの表示はテーブル参照1回で済むため、
+    設定を変えても再デコードは不要。
+    """
+
+    def __init__(self, level=127.5, window=255.0, gamma=1.0, colormap="グレー"):
+        self.level = float(level)
+        self.window = float(window)
+        self.gamma = float(gamma)
+        self.colormap = colormap
+        self._tables = OrderedDict()  # (型, 設定) -> テーブル
+
+    @property
+    def key(self):
+        """現在の設定を表すキー（エンコード済み画像のキャッシュに使用）"""
+        return (self.level, self.window, self.gamma, self.colormap)
+
+    @property
+    def value_range(self):
+        """表示範囲 (下限, 上限)"""
+        half = self.window / 2
+        return self.level - half, self.level + half
+
+    def set(self, level=None, window=None, gamma=None, colormap=None):
+        """設定を変更し、変化があったかどうかを返す"""
+        previous = self.key
+        if level is not None:
+            self.level = float(level)
+        if window is not None:
+            self.window = max(float(window), 1e-6)
+        if gamma is not None:
+            self.gamma = max(float(gamma), 1e-3)
+        if colormap is not None:
+            self.colormap = colormap
+        return self.key != previous
+
+    def set_range(self, low, high):
+        """表示範囲 (下限, 上限) からウィンドウ/レベルを設定"""
+        return self.set(level=(low + high) / 2, window=high - low)
+
+    def table(self, dtype):
+        """dtype用のRGBルックアップテーブル（設定ごとにキャッシュ）"""
+        dtype = np.dtype(dtype)
+        low, _ = self.value_range
+        return self._cached_table(dtype, low, self.window)
+
+    def _cached_table(self, dtype, low, window):
+        cache_key = (dtype.str, low, window, self.gamma, self.colormap)
+        table = self._tables.get(cache_key)
+        if table is not None:
+            self._tables.move_to_end(cache_key)
+            return table
+
+        offset = _LUT_OFFSETS[dtype]
+        values = np.arange(1 << (8 * dtype.itemsize), dtype=np.float32) - offset
+        table = self._build(values, low, window)
+        self._tables[cache_key] = table
+        while len(self._tables) > 4:
+            self._tables.popitem(last=False)
+        return table
+
+    def _build(self, values, low, window):
+        """画素値の配列を表示用のRGB値へ写すテーブルを作成"""
+        scaled = np.clip((values - low) / window, 0.0, 1.0)
+        if self.gamma != 1.0:
+            scaled **= 1.0 / self.gamma
+        gray = (scaled * 255 + 0.5).astype(np.uint8)
+
+        colormap = COLORMAPS.get(self.colormap)
+        if colormap is None:
+            return np.repeat(gray[:, None], 3, axis=1)
+        # applyColorMapはBGRで返すのでRGBに並べ替える
+        colored = cv2.applyColorMap(gray.reshape(-1, 1), getattr(cv2, colormap))
+        return np.ascontiguousarray(colored[:, 0, ::-1])
+
+    def apply(self, frame):
+        """フレームに表示設定を適用してRGB (uint8) 画像を返す"""
+        offset = _LUT_OFFSETS.get(frame.dtype)
+        if offset is not None and frame.ndim == 2:
+            table = self.table(frame.dtype)
+            if offset:
+                # 符号付き整数は符号ビットを反転してテーブルの添字にする
+                unsigned = np.dtype(f"u{frame.dtype.itemsize}")
+                frame = frame.view(unsigned) ^ unsigned.type(offset)
+            return table[frame]
+
+        if frame.dtype == np.uint8 and frame.ndim == 3:
+            table = self.table(np.uint8)
+            if COLORMAPS.get(self.colormap) is None:
+                # RGBフレームはチャンネルごとに明るさ/コントラストのみ適用
+                return cv2.LUT(frame, table[:, 0])
+            gray = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
+            return table[gray]
+
+        # その他の型（浮動小数点・32ビット整数など）は表示範囲で8ビットに変換してから
+        # ガンマ/カラーマップを適用（NaNは下限の色になる）
+        gray = scale_to_uint8(frame, *self.value_range)
+        if gray.ndim == 3:
+            gray = cv2.cvtColor(gray, cv2.COLOR_RGB2GRAY)
+        return self._cached_table(np.dtype(np.uint8), 0.0, 255.0)[gray]
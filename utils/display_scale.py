@@ -0,0 +1,73 @@
+import numpy as np
+
+# 値域の推定に使う最大画素数（これより大きい画像は等間隔に間引く）
+RANGE_SAMPLES = 1 << 18
+
+# 8ビット化で一度に処理する画素数の目安（float32の作業領域の大きさ）
+_CHUNK_PIXELS = 1 << 20
+
+
+def finite_sample(img, max_samples=RANGE_SAMPLES):
+    """
+    画像から等間隔に間引いた画素のうち、有限値（NaN/infを除く）だけを返す
+
+    Args:
+        img: 任意の型・形状の画像
+        max_samples: 間引いた後の最大画素数
+
+    Returns:
+        np.ndarray: 1次元の画素値の配列（有限値がない場合は空）
+    """
+    flat = img.reshape(-1)
+    step = max(1, flat.size // max_samples)
+    sample = flat[::step]
+    if sample.dtype.kind == "f":
+        sample = sample[np.isfinite(sample)]
+    return sample
+
+
+def estimate_range(img, max_samples=RANGE_SAMPLES):
+    """間引いた画素から NaN/inf を除いた (最小値, 最大値) を推定する"""
+    sample = finite_sample(img, max_samples)
+    if sample.size == 0:
+        return 0.0, 0.0
+    return float(sample.min()), float(sample.max())
+
+
+def scale_to_uint8(img, low, high, out=None):
+    """
+    [low, high] を 0-255 に写した uint8 画像を作成する
+
+    先頭の軸に沿って分割し、確保済みのfloat32作業領域の中で引き算・掛け算・クリップを
+    行うので、画像全体の浮動小数点コピーは作らない。符号付き整数・浮動小数点にも使え、
+    NaNは0、±infは0/255になる。
+
+    Args:
+        img: 任意の数値型の画像
+        low: 0に対応する値
+        high: 255に対応する値（low以下の場合は全画素0）
+        out: 書き込み先の uint8 配列（Noneの場合は新しく確保）
+
+    Returns:
+        np.ndarray: img と同じ形状の uint8 画像
+    """
+    if out is None:
+        out = np.empty(img.shape, dtype=np.uint8)
+    if high <= low or img.size == 0:
+        out[...] = 0
+        return out
+
+    scale = np.float32(255.0 / (high - low))
+    low = np.float32(low)
+    rows = max(1, _CHUNK_PIXELS // max(1, img[:1].size))
+    work = np.empty((min(rows, len(img)),) + img.shape[1:], dtype=np.float32)
+    for start in range(0, len(img), rows):
+        chunk = img[start : start + rows]
+        buf = work[: len(chunk)]
+        np.subtract(chunk, low, out=buf, dtype=np.float32, casting="unsafe")
+        buf *= scale
+        np.clip(buf, 0, 255, out=buf)
+        if img.dtype.kind == "f":
+            np.nan_to_num(buf, copy=False, nan=0.0)
+        np.copyto(out[start : start + rows], buf, casting="unsafe")
+    return out
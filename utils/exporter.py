@@ -0,0 +1,118 @@
+import os
+import warnings
+import numpy as np
+import tifffile
+from utils.registration import apply_shift
+from utils.tiff_loader import TiffLoader
+
+# 書き出し時に選択できる圧縮方式（表示名 -> tifffileの指定、Noneは無圧縮）
+COMPRESSIONS = {
+    "なし": None,
+    "Deflate (zlib)": "zlib",
+}
+
+# 通常のTIFFで扱えるサイズの目安（超える場合はBigTIFFで書き出す）
+_CLASSIC_TIFF_LIMIT = 2**32 - 2**25
+
+
+def export_stack(
+    file_path,
+    output_path,
+    start=0,
+    stop=None,
+    step=1,
+    roi=None,
+    compression=None,
+    shifts=None,
+    chunk_size=16,
+    progress_callback=None,
+    stop_event=None,
+):
+    """
+    フレーム範囲・間引き・ROIを指定して新しい(Big)TIFFへストリーム書き出しする
+
+    ページを chunk_size 枚ずつ読み込んでそのまま書き出すため、スタック全体は
+    メモリに載せない。元のビット深度を保持し、無圧縮の場合はページを連続領域に書き込む。
+
+    Args:
+        file_path: 元のTIFFファイルのパス
+        output_path: 書き出し先のパス
+        start: 先頭フレーム番号
+        stop: 終端フレーム番号（含まない）。Noneの場合は最後まで
+        step: フレームの間引き間隔
+        roi: 切り出す矩形 (x, y, 幅, 高さ)。Noneの場合は画像全体。
+             画像からはみ出した部分は切り詰め、負の値はエラーにする
+        compression: tifffileの圧縮方式（"zlib"など）。Noneの場合は無圧縮
+        shifts: ドリフト補正のシフト表 (フレーム数, 2)。指定した場合は切り出し前に補正する
+        chunk_size: 1回に読み込むページ数
+        progress_callback: 進捗を通知するコールバック関数 (引数: 進捗率0.0-1.0)
+        stop_event: セットされると書き出しを中断するイベント
+
+    Returns:
+        int: 書き出したフレーム数（中断された場合は0）
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        with tifffile.TiffFile(file_path) as tif:
+            total = len(tif.pages)
+            page = tif.pages[0]
+            shape, dtype = page.shape, page.dtype
+            photometric = page.photometric
+
+    stop = total if stop is None else min(stop, total)
+    frame_count = len(range(start, stop, step))
+    if frame_count <= 0:
+        raise ValueError("フレーム範囲が空です")
+
+    crop = (slice(None), slice(None))
+    if roi is not None:
+        x, y, width, height = roi
+        # 負の開始位置はスライスでは末尾からの位置になり、別の領域を切り出してしまう
+        if min(roi) < 0:
+            raise ValueError("ROIには0以上の値を指定してください")
+        crop = (slice(y, y + height), slice(x, x + width))
+        shape = (
+            len(range(*crop[0].indices(shape[0]))),
+            len(range(*crop[1].indices(shape[1]))),
+        ) + tuple(shape[2:])
+        if shape[0] == 0 or shape[1] == 0:
+            raise ValueError("ROIが画像の範囲外です")
+
+    estimated = frame_count * int(np.prod(shape)) * dtype.itemsize
+    written = [0]
+
+    def frames():
+        """読み込んだチャンクからROIを切り出して1フレームずつ渡す"""
+        for offset, chunk in TiffLoader.iter_page_chunks(
+            file_path, start, stop, chunk_size, stop_event, step
+        ):
+            written[0] += len(chunk)
+            if progress_callback:
+                progress_callback(written[0] / frame_count)
+            if shifts is None:
+                yield from chunk[(slice(None),) + crop]
+                continue
+            for i, frame in enumerate(chunk):
+                yield apply_shift(frame, shifts[offset + i * step])[crop]
+
+    try:
+        # 1シリーズとして書き出す（無圧縮の場合はページが連続領域に並ぶ）
+        with tifffile.TiffWriter(
+            output_path, bigtiff=estimated > _CLASSIC_TIFF_LIMIT
+        ) as writer:
+            writer.write(
+                frames(),
+                shape=(frame_count,) + tuple(shape),
+                dtype=dtype,
+                photometric=photometric,
+                compression=compression,
+            )
+    except Exception:
+        # 中断または失敗した場合は書きかけのファイルを残さない
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        if stop_event is not None and stop_event.is_set():
+            return 0
+        raise
+
+    return written[0]
@@ -0,0 +1,159 @@
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.config import FRAME_SERVER_HOST, FRAME_SERVER_PORT
+
+# URLが変わらない限り内容も変わらないフレームに付けるキャッシュ指定
+_IMMUTABLE = "public, max-age=31536000, immutable"
+
+_LOOPBACK_HOSTS = ("127.0.0.1", "localhost", "::1")
+_ANY_HOSTS = ("", "0.0.0.0", "::")
+
+
+class _FrameRequestHandler(BaseHTTPRequestHandler):
+    """GET /<トークン>/<スタンプ>/<フレーム番号>.png に応答する"""
+
+    def do_GET(self):
+        parts = self.path.strip("/").split("/")
+        if len(parts) != 3 or not parts[2].endswith(".png"):
+            self.send_error(404)
+            return
+        token, stamp, name = parts
+        provider = self.server.frame_server.provider(token)
+        try:
+            frame_idx = int(name[: -len(".png")])
+            result = provider(frame_idx, stamp) if provider else None
+        except Exception as e:
+            print(f"フレーム配信エラー: {str(e)}")
+            result = None
+        if result is None:
+            self.send_error(404)
+            return
+
+        data, cacheable = result
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(data)))
+        # 表示設定が途中で変わった画像はキャッシュさせない
+        self.send_header("Cache-Control", _IMMUTABLE if cacheable else "no-store")
+        # Webモードではページと別オリジンになるため
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        # リクエストごとのログは出さない
+        pass
+
+
+class FrameServer:
+    """
+    エンコード済みフレームをローカルHTTPで配信するサーバー
+
+    再生中にbase64文字列をコントロールツリー経由で送る代わりに、Imageコントロールには
+    フレームごとのURLだけを渡し、画像本体はこのサーバーからバイナリのまま取得させる。
+    URLには表示設定を表すスタンプを含めるので、同じURLの画像はクライアント側でキャッシュできる。
+    URLのホスト名は接続するブラウザごとに url_host() で決める。
+    """
+
+    def __init__(self, host=FRAME_SERVER_HOST, port=FRAME_SERVER_PORT):
+        """
+        初期化（サーバーは最初の register() で起動する）
+
+        Args:
+            host: 待ち受けるアドレス
+            port: 待ち受けるポート（0の場合は空いているポートを使用）
+        """
+        self.host = host
+        self.port = port
+        self._lock = threading.Lock()
+        self._httpd = None
+        self._providers = {}  # トークン -> provider(frame_idx, stamp)
+
+    def start(self):
+        """サーバーを起動する（起動済みの場合は何もしない）"""
+        with self._lock:
+            if self._httpd is not None:
+                return
+            httpd = ThreadingHTTPServer((self.host, self.port), _FrameRequestHandler)
+            httpd.daemon_threads = True
+            httpd.frame_server = self
+            self._httpd = httpd
+            self.port = httpd.server_address[1]
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        print(f"フレーム配信サーバー: {self.base_url()}")
+
+    def url_host(self, page_host=None):
+        """
+        ブラウザがこのサーバーに接続するときのホスト名
+
+        Args:
+            page_host: ブラウザがアプリのページを開いたときのホスト名
+                       （デスクトップモードなど、同じマシンで表示する場合は None）
+
+        Returns:
+            str or None: URLに使うホスト名。ループバックでしか待ち受けていないのに
+                         別のマシンのブラウザから開かれている場合は None
+        """
+        if not page_host or page_host in _LOOPBACK_HOSTS:
+            if self.host in _ANY_HOSTS or self.host in _LOOPBACK_HOSTS:
+                return page_host or "127.0.0.1"
+            return self.host
+        if self.host in _LOOPBACK_HOSTS:
+            return None
+        # 全アドレスで待ち受けている場合は、ページを開いたのと同じホスト名で接続させる
+        return page_host if self.host in _ANY_HOSTS else self.host
+
+    def base_url(self, host=None):
+        """
+        サーバーのURL
+
+        Args:
+            host: URLに使うホスト名（Noneの場合は url_host() の既定値）
+        """
+        host = host or self.url_host()
+        if ":" in host:
+            host = f"[{host}]"
+        return f"http://{host}:{self.port}"
+
+    def register(self, provider):
+        """
+        フレームの提供元を登録する
+
+        Args:
+            provider: (フレーム番号, スタンプ) から (PNGのバイト列, キャッシュ可能か) を返す関数。
+                      フレームがない場合は None を返す
+
+        Returns:
+            str: frame_url() に渡すトークン
+        """
+        self.start()
+        token = uuid.uuid4().hex
+        with self._lock:
+            self._providers[token] = provider
+        return token
+
+    def unregister(self, token):
+        with self._lock:
+            self._providers.pop(token, None)
+
+    def provider(self, token):
+        with self._lock:
+            return self._providers.get(token)
+
+    def frame_url(self, token, frame_idx, stamp, host=None):
+        """フレーム画像のURL（host は url_host() で求めたホスト名）"""
+        return f"{self.base_url(host)}/{token}/{stamp}/{frame_idx}.png"
+
+    def shutdown(self):
+        with self._lock:
+            httpd, self._httpd = self._httpd, None
+            self._providers.clear()
+        if httpd is not None:
+            httpd.shutdown()
+            httpd.server_close()
+
+
+# プロセス全体で共有するサーバー
+frame_server = FrameServer()
@@ -0,0 +1,195 @@
+import hashlib
+import numpy as np
+from utils.display_scale import finite_sample
+
+# フレームごとに保持する粗いヒストグラムのビン数
+HIST_BINS = 64
+
+# bincountで1パス集計できる整数型と、符号なしに写すためのオフセット
+_BINCOUNT_OFFSETS = {
+    np.dtype(np.uint8): 0,
+    np.dtype(np.uint16): 0,
+    np.dtype(np.int8): 1 << 7,
+    np.dtype(np.int16): 1 << 15,
+}
+
+
+def compute_frame_stats(img, bins=HIST_BINS):
+    """
+    1フレームの統計量を計算する
+
+    16ビット以下の整数型はbincountによる1回の走査で、最小値・最大値・平均・標準偏差・
+    ヒストグラムをまとめて求める（画素値の種類数は高々65536なので後段の計算は軽い）。
+
+    Returns:
+        tuple: (最小値, 最大値, 平均, 標準偏差, [min, max] を等分したヒストグラム)
+    """
+    offset = _BINCOUNT_OFFSETS.get(img.dtype)
+    if offset is not None:
+        flat = img.ravel()
+        if offset:
+            # 符号付き整数は符号ビットを反転すると大小関係を保ったまま符号なしになる
+            unsigned = np.dtype(f"u{img.dtype.itemsize}")
+            flat = flat.view(unsigned) ^ unsigned.type(offset)
+        counts = np.bincount(flat)
+        nonzero = np.flatnonzero(counts)
+        if len(nonzero) == 0:
+            return 0.0, 0.0, 0.0, 0.0, np.zeros(bins, dtype=np.uint32)
+        lo, hi = int(nonzero[0]), int(nonzero[-1])
+        counts = counts[lo : hi + 1]
+        values = np.arange(lo, hi + 1, dtype=np.float64)
+
+        n = flat.size
+        mean = counts @ values / n
+        var = max(0.0, counts @ (values * values) / n - mean * mean)
+        bin_idx = (np.arange(hi - lo + 1) * bins) // (hi - lo + 1)
+        hist = np.bincount(bin_idx, weights=counts, minlength=bins)
+        return (
+            float(lo - offset),
+            float(hi - offset),
+            float(mean - offset),
+            float(np.sqrt(var)),
+            hist.astype(np.uint32),
+        )
+
+    # その他の型（浮動小数点など）は間引いた画素の有限値（NaN/infを除く）から推定
+    data = finite_sample(img)
+    if data.size == 0:
+        return 0.0, 0.0, 0.0, 0.0, np.zeros(bins, dtype=np.uint32)
+    lo = float(data.min())
+    hi = float(data.max())
+    hist, _ = np.histogram(data, bins=bins, range=(lo, hi if hi > lo else lo + 1))
+    return lo, hi, float(data.mean()), float(data.std()), hist.astype(np.uint32)
+
+
+def _raw_bytes(img):
+    """画像のバイト列（NaNを含む浮動小数点も値ではなくビットで比較するため）"""
+    return np.ascontiguousarray(img).reshape(-1).view(np.uint8)
+
+
+class FrameStatsIndex:
+    """
+    ファイル全体のフレーム統計インデックス
+
+    読み込み時に各フレームの統計量を1回だけ計算して配列に保持し、
+    正規化・オートコントラスト・重複フレームの検出では画素データを再走査しない。
+    """
+
+    def __init__(self, frame_count, bins=HIST_BINS):
+        self.bins = bins
+        self.minimum = np.zeros(frame_count, dtype=np.float64)
+        self.maximum = np.zeros(frame_count, dtype=np.float64)
+        self.mean = np.zeros(frame_count, dtype=np.float32)
+        self.std = np.zeros(frame_count, dtype=np.float32)
+        self.hist = np.zeros((frame_count, bins), dtype=np.uint32)
+        self.valid = np.zeros(frame_count, dtype=bool)
+        # 同じ内容の先頭フレーム番号（find_duplicates() で設定）
+        self.duplicate_of = None
+
+    def __len__(self):
+        return len(self.valid)
+
+    def update(self, frame_idx, img):
+        """フレームの統計量を計算して登録し、(最小値, 最大値) を返す"""
+        lo, hi, mean, std, hist = compute_frame_stats(img, self.bins)
+        self.minimum[frame_idx] = lo
+        self.maximum[frame_idx] = hi
+        self.mean[frame_idx] = mean
+        self.std[frame_idx] = std
+        self.hist[frame_idx] = hist
+        self.valid[frame_idx] = True
+        return lo, hi
+
+    def missing_frames(self):
+        """統計がない（読み込めなかった）フレーム番号"""
+        return np.flatnonzero(~self.valid)
+
+    def value_range(self, frame_idx):
+        """フレームの (最小値, 最大値)"""
+        return self.minimum[frame_idx], self.maximum[frame_idx]
+
+    def global_range(self):
+        """全フレームを通した (最小値, 最大値)"""
+        if not self.valid.any():
+            return 0.0, 0.0
+        return (
+            float(self.minimum[self.valid].min()),
+            float(self.maximum[self.valid].max()),
+        )
+
+    def auto_contrast(self, frame_idx=None, saturated=0.35):
+        """
+        ヒストグラムから上下 saturated % を飽和させる表示範囲を求める
+
+        Args:
+            frame_idx: 対象フレーム。Noneの場合は全フレームの中央値
+            saturated: 上下それぞれで飽和させる画素の割合（%）
+
+        Returns:
+            tuple: (下限, 上限)
+        """
+        indices = np.flatnonzero(self.valid) if frame_idx is None else [frame_idx]
+        if len(indices) == 0:
+            return 0.0, 0.0
+
+        hist = self.hist[indices].astype(np.float64)
+        cdf = np.cumsum(hist, axis=1)
+        total = cdf[:, -1:]
+        total[total == 0] = 1
+        cdf /= total
+
+        q = saturated / 100.0
+        lo_bin = (cdf < q).sum(axis=1)
+        hi_bin = np.minimum((cdf < 1.0 - q).sum(axis=1) + 1, self.bins)
+
+        # ビン番号を各フレームの [min, max] 上の値に戻す
+        lo = self.minimum[indices]
+        width = (self.maximum[indices] - lo) / self.bins
+        return (
+            float(np.median(lo + lo_bin * width)),
+            float(np.median(lo + hi_bin * width)),
+        )
+
+    def find_duplicates(self, frames):
+        """
+        画素値がまったく同じフレームを探し、duplicate_of に記録する
+
+        統計量がすべて一致するフレームだけを候補としてハッシュを計算し、
+        ハッシュが一致したものはバイト列を比較して確認する。
+
+        Args:
+            frames: 統計量を計算したフレーム列
+
+        Returns:
+            np.ndarray: duplicate_of[i] は frame i と同じ内容の最初のフレーム番号
+        """
+        duplicate_of = np.arange(len(self.valid))
+        candidates = {}
+        for idx in np.flatnonzero(self.valid):
+            key = (
+                self.minimum[idx],
+                self.maximum[idx],
+                self.mean[idx],
+                self.std[idx],
+                self.hist[idx].tobytes(),
+            )
+            candidates.setdefault(key, []).append(idx)
+
+        for indices in candidates.values():
+            if len(indices) < 2:
+                continue
+            first_by_digest = {}
+            for idx in indices:
+                raw = _raw_bytes(frames[idx])
+                digest = hashlib.blake2b(raw, digest_size=16).digest()
+                first = first_by_digest.setdefault(digest, idx)
+                if first != idx and np.array_equal(raw, _raw_bytes(frames[first])):
+                    duplicate_of[idx] = first
+        self.duplicate_of = duplicate_of
+        return duplicate_of
+
+    def duplicate_count(self):
+        """他のフレームと同じ内容のため共有されているフレーム数"""
+        if self.duplicate_of is None:
+            return 0
+        return int(np.count_nonzero(self.duplicate_of != np.arange(len(self.valid))))
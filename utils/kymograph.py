@@ -0,0 +1,168 @@
+import warnings
+import numpy as np
+import tifffile
+from utils.config import NUM_WORKERS
+from utils.parallel import ProgressCounter, map_ranges
+from utils.registration import iter_frame_batches
+
+
+def polyline_samples(points, width, height):
+    """
+    折れ線上を約1画素間隔でサンプリングした画素座標を求める
+
+    Args:
+        points: 頂点 [(x, y), ...]（画像の画素座標）
+        width: 画像の幅
+        height: 画像の高さ
+
+    Returns:
+        tuple: (xs, ys) 整数座標の配列
+    """
+    points = np.asarray(points, dtype=np.float64)
+    if len(points) < 2:
+        raise ValueError("線には2つ以上の頂点が必要です")
+
+    segments = []
+    for p0, p1 in zip(points[:-1], points[1:]):
+        count = max(1, int(np.ceil(np.hypot(*(p1 - p0)))))
+        t = np.arange(count) / count
+        segments.append(p0 + t[:, None] * (p1 - p0))
+    segments.append(points[-1:])
+    samples = np.rint(np.concatenate(segments)).astype(np.int64)
+
+    xs = np.clip(samples[:, 0], 0, width - 1)
+    ys = np.clip(samples[:, 1], 0, height - 1)
+    return xs, ys
+
+
+def _sample_offsets(page, xs, ys):
+    """
+    非圧縮ページでサンプル点の画素がファイル内のどこにあるかを求める
+
+    ストリップの配置に関係なく各点のバイト位置が分かるので、
+    線が通る画素だけを読み出せる。圧縮・タイル・プレーン分割のページはNone。
+    """
+    if (
+        page.compression != 1
+        or page.is_tiled
+        or page.planarconfig != 1
+        or page.fillorder != 1
+        or page.dtype is None
+        or page.bitspersample != page.dtype.itemsize * 8
+    ):
+        return None
+    pixel_bytes = page.samplesperpixel * page.dtype.itemsize
+    rows_per_strip = min(page.rowsperstrip or page.imagelength, page.imagelength)
+    strip_offsets = np.asarray(page.dataoffsets, dtype=np.int64)
+    return (
+        strip_offsets[ys // rows_per_strip]
+        + (ys % rows_per_strip) * (page.imagewidth * pixel_bytes)
+        + xs * pixel_bytes
+    )
+
+
+def _sample_tiff_range(file_path, start, stop, xs, ys, out, stop_event, tick):
+    """ページ範囲から線上の画素を読み出し、out の先頭から順に書き込む"""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        with tifffile.TiffFile(file_path) as tif:
+            # ファイル全体をメモリマップし、必要なバイトだけをOSに読ませる
+            raw = np.memmap(file_path, dtype=np.uint8, mode="r")
+            for idx in range(start, stop):
+                if stop_event is not None and stop_event.is_set():
+                    return
+                page = tif.pages[idx]
+                offsets = _sample_offsets(page, xs, ys)
+                if offsets is None:
+                    # 圧縮ページはデコードしてから取り出す
+                    out[idx - start] = page.asarray()[ys, xs]
+                else:
+                    pixel_bytes = page.samplesperpixel * page.dtype.itemsize
+                    values = raw[offsets[:, None] + np.arange(pixel_bytes)]
+                    dtype = page.dtype.newbyteorder(tif.byteorder)
+                    out[idx - start] = values.view(dtype).reshape(out.shape[1:])
+                tick()
+
+
+def extract_kymograph(
+    source,
+    points,
+    start=0,
+    stop=None,
+    batch_size=16,
+    max_workers=NUM_WORKERS,
+    progress_callback=None,
+    stop_event=None,
+):
+    """
+    線（折れ線）に沿った輝度を全フレームから取り出し、キモグラフ画像を作成する
+
+    TIFFファイルの非圧縮ページは線が通る画素のバイト位置だけをメモリマップ経由で読み、
+    フレーム全体はデコードしない。動画のフレームソースはワーカーごとに別のキャプチャで
+    順にデコードする。ページ範囲はワーカー数に分割して並列に処理する。
+
+    Args:
+        source: TIFFファイルのパス、または添字アクセスできるフレーム列
+        points: 線の頂点 [(x, y), ...]（画像の画素座標）
+        start: 先頭フレーム番号
+        stop: 終端フレーム番号（含まない）。Noneの場合は最後まで
+        batch_size: フレーム列から1回に読み込むフレーム数
+        max_workers: 並列に処理するページ範囲の数
+        progress_callback: 進捗を通知するコールバック関数 (引数: 進捗率0.0-1.0)
+        stop_event: セットされると処理を中断するイベント
+
+    Returns:
+        np.ndarray: (フレーム数, 線上の点数[, C]) の元の型の配列（縦軸が時間）。
+                    中断された場合は None
+    """
+    if isinstance(source, str):
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UserWarning)
+            with tifffile.TiffFile(source) as tif:
+                frame_count = len(tif.pages)
+                page = tif.pages[0]
+                shape, dtype = page.shape, page.dtype
+    else:
+        frame_count = len(source)
+
+    stop = frame_count if stop is None else min(stop, frame_count)
+    total = stop - start
+    if total <= 0:
+        raise ValueError("フレーム範囲が空です")
+    if not isinstance(source, str):
+        # 動画の場合も再生用のキャプチャを使わないよう、読み出しと同じ経路で取得する
+        _, first = next(iter_frame_batches(source, start, start + 1, 1))
+        shape, dtype = first[0].shape, first[0].dtype
+
+    xs, ys = polyline_samples(points, shape[1], shape[0])
+    out = np.empty((total, len(xs)) + tuple(shape[2:]), dtype=dtype)
+
+    counter = ProgressCounter(total, progress_callback, interval=100)
+
+    def sample_range(range_start, range_stop):
+        # out は start を0とした位置で書き込む
+        target = out[range_start - start : range_stop - start]
+        if isinstance(source, str):
+            _sample_tiff_range(
+                source,
+                range_start,
+                range_stop,
+                xs,
+                ys,
+                target,
+                stop_event,
+                counter.add,
+            )
+            return
+        for offset, batch in iter_frame_batches(
+            source, range_start, range_stop, batch_size, stop_event
+        ):
+            for i, frame in enumerate(batch):
+                target[offset - range_start + i] = frame[ys, xs]
+                counter.add()
+
+    map_ranges(sample_range, start, stop, max_workers)
+
+    if stop_event is not None and stop_event.is_set():
+        return None
+    return out
@@ -0,0 +1,56 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+
+class ProgressCounter:
+    """複数のワーカーが処理した件数を合計し、進捗率をコールバックに通知する"""
+
+    def __init__(self, total, progress_callback=None, interval=1):
+        """
+        初期化
+
+        Args:
+            total: 全体の件数
+            progress_callback: 進捗を通知するコールバック関数 (引数: 進捗率0.0-1.0)
+            interval: 通知する間隔（件数）。最後の1件は必ず通知する
+        """
+        self.total = total
+        self.progress_callback = progress_callback
+        self.interval = interval
+        self._done = 0
+        self._lock = threading.Lock()
+
+    def add(self, count=1):
+        """処理済みの件数を加算する（どのスレッドから呼んでもよい）"""
+        with self._lock:
+            before = self._done
+            self._done += count
+            done = self._done
+        if self.progress_callback and (
+            done // self.interval != before // self.interval or done == self.total
+        ):
+            self.progress_callback(done / self.total)
+
+
+def map_ranges(func, start, stop, max_workers):
+    """
+    [start, stop) をワーカー数でほぼ等分し、各範囲に func を並列に適用する
+
+    Args:
+        func: func(範囲の先頭, 範囲の終端) を受け取る関数
+        start: 先頭番号
+        stop: 終端番号（含まない）
+        max_workers: 分割する範囲の最大数
+
+    Returns:
+        list: 範囲の順に並んだ func の戻り値
+    """
+    bounds = np.linspace(start, stop, max(1, min(max_workers, stop - start)) + 1)
+    bounds = bounds.astype(int)
+    ranges = [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+    if not ranges:
+        return []
+    with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+        futures = [executor.submit(func, a, b) for a, b in ranges]
+        return [future.result() for future in futures]
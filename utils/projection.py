@@ -0,0 +1,159 @@
+import numpy as np
+from utils.config import NUM_WORKERS
+from utils.parallel import ProgressCounter, map_ranges
+from utils.tiff_loader import TiffLoader
+
+# 対応している投影方法（表示名）
+PROJECTIONS = {
+    "max": "最大値投影",
+    "mean": "平均値投影",
+    "std": "標準偏差投影",
+    "min": "最小値投影",
+}
+
+
+class _ProjectionAccumulator:
+    """
+    ページのチャンクを受け取り、投影結果をその場で更新する
+
+    浮動小数点データの NaN/inf は欠損として扱う。max/min は fmax/fmin で NaN を無視し、
+    mean/std は画素ごとの有効フレーム数で割る（全フレームが欠損の画素は NaN になる）。
+    """
+
+    def __init__(self, method):
+        self.method = method
+        self.count = 0
+        self.value = None  # max/min: 現在の極値, mean/std: 合計
+        self.sq_sum = None  # std: 二乗和
+        self.valid_count = None  # 浮動小数点の mean/std: 画素ごとの有効フレーム数
+
+    def add(self, chunk):
+        self.count += len(chunk)
+        if self.method in ("max", "min"):
+            reduce = np.fmax if self.method == "max" else np.fmin
+            part = reduce.reduce(chunk, axis=0)
+            if self.value is None:
+                self.value = part
+            else:
+                reduce(self.value, part, out=self.value)
+            return
+
+        # 整数データはfloat64の合計/二乗和なら誤差なく累積できる
+        data = chunk.astype(np.float64)
+        if chunk.dtype.kind == "f":
+            valid = np.isfinite(data)
+            data[~valid] = 0
+            part = valid.sum(axis=0)
+            if self.valid_count is None:
+                self.valid_count = part
+            else:
+                self.valid_count += part
+        part = data.sum(axis=0)
+        if self.value is None:
+            self.value = part
+        else:
+            self.value += part
+        if self.method == "std":
+            data *= data
+            part = data.sum(axis=0)
+            if self.sq_sum is None:
+                self.sq_sum = part
+            else:
+                self.sq_sum += part
+
+    def merge(self, other):
+        """別のページ範囲の途中結果を統合する"""
+        if other.value is None:
+            return
+        if self.value is None:
+            self.count, self.value = other.count, other.value
+            self.sq_sum, self.valid_count = other.sq_sum, other.valid_count
+            return
+        self.count += other.count
+        if self.method == "max":
+            np.fmax(self.value, other.value, out=self.value)
+        elif self.method == "min":
+            np.fmin(self.value, other.value, out=self.value)
+        else:
+            self.value += other.value
+            if self.method == "std":
+                self.sq_sum += other.sq_sum
+            if self.valid_count is not None:
+                self.valid_count += other.valid_count
+
+    def result(self):
+        if self.value is None:
+            return None
+        if self.method in ("max", "min"):
+            return self.value
+        count = self.count if self.valid_count is None else self.valid_count
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = self.value / count
+            if self.method == "mean":
+                return mean.astype(np.float32)
+            var = np.maximum(self.sq_sum / count - mean * mean, 0)
+        return np.sqrt(var).astype(np.float32)
+
+
+def project_stack(
+    file_path,
+    method="max",
+    start=0,
+    stop=None,
+    chunk_size=16,
+    max_workers=NUM_WORKERS,
+    progress_callback=None,
+    stop_event=None,
+):
+    """
+    TIFFスタックをストリーム読み込みしながらZ/T投影を計算する
+
+    ページ範囲をワーカー数に分割し、各ワーカーが chunk_size 枚ずつ読み込んで
+    途中結果をその場で更新する。最後に各範囲の途中結果を統合するため、
+    メモリ使用量はスタックの長さに依存しない。
+
+    Args:
+        file_path: TIFFファイルのパス
+        method: "max" / "mean" / "std" / "min"
+        start: 先頭フレーム番号
+        stop: 終端フレーム番号（含まない）。Noneの場合は最後まで
+        chunk_size: 1回に読み込むページ数
+        max_workers: 並列に処理するページ範囲の数
+        progress_callback: 進捗を通知するコールバック関数 (引数: 進捗率0.0-1.0)
+        stop_event: セットされると計算を中断するイベント
+
+    Returns:
+        np.ndarray: 投影画像（max/minは元の型、mean/stdはfloat32）。中断された場合は None
+    """
+    if method not in PROJECTIONS:
+        raise ValueError(f"未対応の投影方法です: {method}")
+
+    if stop is None:
+        import tifffile
+
+        with tifffile.TiffFile(file_path) as tif:
+            stop = len(tif.pages)
+    total = stop - start
+    if total <= 0:
+        raise ValueError("フレーム範囲が空です")
+
+    counter = ProgressCounter(total, progress_callback)
+
+    def project_range(range_start, range_stop):
+        accumulator = _ProjectionAccumulator(method)
+        for _, chunk in TiffLoader.iter_page_chunks(
+            file_path, range_start, range_stop, chunk_size, stop_event
+        ):
+            accumulator.add(chunk)
+            counter.add(len(chunk))
+        return accumulator
+
+    partials = map_ranges(project_range, start, stop, max_workers)
+
+    if stop_event is not None and stop_event.is_set():
+        return None
+
+    result = _ProjectionAccumulator(method)
+    for partial in partials:
+        result.merge(partial)
+    return result.result()
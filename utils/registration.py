@@ -0,0 +1,198 @@
+import os
+import numpy as np
+import cv2
+from utils.config import NUM_WORKERS
+from utils.parallel import ProgressCounter, map_ranges
+from utils.tiff_loader import TiffLoader
+
+
+def shift_cache_path(file_path):
+    """シフト表を保存するファイルのパス（元ファイルと同じ場所）"""
+    return f"{file_path}.drift.npz"
+
+
+def save_shifts(file_path, shifts, reference):
+    """シフト表を元ファイルの横に保存（書き込めない場合は何もしない）"""
+    stat = os.stat(file_path)
+    try:
+        np.savez(
+            shift_cache_path(file_path),
+            shifts=shifts,
+            reference=reference,
+            source=np.array([stat.st_size, stat.st_mtime_ns], dtype=np.int64),
+        )
+    except OSError as e:
+        print(f"シフト表を保存できませんでした: {str(e)}")
+
+
+def load_shifts(file_path):
+    """保存済みのシフト表を読み込む（元ファイルが更新されている場合はNone）"""
+    cache_path = shift_cache_path(file_path)
+    if not os.path.exists(cache_path):
+        return None
+    try:
+        stat = os.stat(file_path)
+        with np.load(cache_path) as data:
+            if list(data["source"]) != [stat.st_size, stat.st_mtime_ns]:
+                return None
+            return data["shifts"]
+    except Exception as e:
+        print(f"シフト表を読み込めませんでした: {str(e)}")
+        return None
+
+
+def _prepare(frame, downsample):
+    """位相相関用にグレースケール化・縮小したfloat32画像を作成"""
+    if frame.ndim == 3:
+        frame = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
+    img = frame.astype(np.float32)
+    if frame.dtype.kind == "f":
+        # 浮動小数点スタックのNaN/infは位相相関を壊すので0にする
+        np.nan_to_num(img, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+    if downsample > 1:
+        height, width = img.shape
+        img = cv2.resize(
+            img,
+            (max(1, width // downsample), max(1, height // downsample)),
+            interpolation=cv2.INTER_AREA,
+        )
+    return img
+
+
+def iter_frame_batches(source, start, stop, batch_size, stop_event=None):
+    """
+    ファイルパスまたはフレーム列から (先頭番号, フレームの列) を batch_size 枚ずつ順に返す
+
+    TIFFファイルはページをまとめて読み、動画のフレームソースは iter_chunks() で
+    再生用のキャプチャとフレームキャッシュを使わずにデコードする。
+    RegisteredFrames は元のフレーム列を同じように読んでから補正する。
+    """
+    if isinstance(source, str):
+        yield from TiffLoader.iter_page_chunks(
+            source, start, stop, batch_size, stop_event
+        )
+        return
+    if isinstance(source, RegisteredFrames):
+        for offset, batch in iter_frame_batches(
+            source.frames, start, stop, batch_size, stop_event
+        ):
+            yield offset, [
+                source.register(offset + i, frame) for i, frame in enumerate(batch)
+            ]
+        return
+    if hasattr(source, "iter_chunks"):
+        yield from source.iter_chunks(start, stop, batch_size, stop_event)
+        return
+    for offset in range(start, stop, batch_size):
+        if stop_event is not None and stop_event.is_set():
+            return
+        yield offset, [source[i] for i in range(offset, min(offset + batch_size, stop))]
+
+
+def estimate_shifts(
+    source,
+    frame_count,
+    reference=0,
+    reference_frames=10,
+    downsample=4,
+    batch_size=64,
+    max_workers=NUM_WORKERS,
+    progress_callback=None,
+    stop_event=None,
+):
+    """
+    各フレームの参照画像に対する平行移動量を位相相関で推定する
+
+    フレームは縮小してから cv2.phaseCorrelate にかけ、範囲をワーカーに分けて
+    batch_size 枚ずつ処理する。
+
+    Args:
+        source: TIFFファイルのパス、または添字アクセスできるフレーム列
+                （動画のフレームソースは iter_chunks() で順にデコードする）
+        frame_count: フレーム数
+        reference: 参照画像を作る先頭フレーム番号
+        reference_frames: 参照画像として平均するフレーム数
+        downsample: 縮小率（縦横とも 1/downsample）
+        batch_size: 1回に読み込むフレーム数
+        max_workers: 並列に処理するフレーム範囲の数
+        progress_callback: 進捗を通知するコールバック関数 (引数: 進捗率0.0-1.0)
+        stop_event: セットされると推定を中断するイベント
+
+    Returns:
+        np.ndarray: (フレーム数, 2) の (dx, dy)（元の解像度の画素単位）。中断された場合は None
+    """
+    ref_stop = min(frame_count, reference + max(1, reference_frames))
+    ref_sum = None
+    for _, batch in iter_frame_batches(
+        source, reference, ref_stop, batch_size, stop_event
+    ):
+        for frame in batch:
+            img = _prepare(frame, downsample)
+            ref_sum = img if ref_sum is None else ref_sum + img
+    if ref_sum is None:
+        # 参照フレームのデコード中に中断された
+        return None
+    ref_img = ref_sum / (ref_stop - reference)
+    # 窓関数は自前で掛けておく（window引数を渡した cv2.phaseCorrelate は
+    # 並列に呼ぶと結果が一定しないため）
+    window = cv2.createHanningWindow(ref_img.shape[::-1], cv2.CV_32F)
+    ref_img *= window
+
+    shifts = np.zeros((frame_count, 2), dtype=np.float32)
+    counter = ProgressCounter(frame_count, progress_callback)
+
+    def estimate_range(range_start, range_stop):
+        for offset, batch in iter_frame_batches(
+            source, range_start, range_stop, batch_size, stop_event
+        ):
+            if stop_event is not None and stop_event.is_set():
+                return
+            for i, frame in enumerate(batch):
+                img = _prepare(frame, downsample)
+                img *= window
+                (dx, dy), _ = cv2.phaseCorrelate(ref_img, img)
+                shifts[offset + i] = (dx * downsample, dy * downsample)
+            counter.add(len(batch))
+
+    map_ranges(estimate_range, 0, frame_count, max_workers)
+
+    if stop_event is not None and stop_event.is_set():
+        return None
+    return shifts
+
+
+def apply_shift(frame, shift):
+    """推定した移動量を打ち消すようにフレームを平行移動する"""
+    dx, dy = shift
+    if dx == 0 and dy == 0:
+        return frame
+    height, width = frame.shape[:2]
+    matrix = np.float32([[1, 0, -dx], [0, 1, -dy]])
+    # cv2.warpAffine は float16 に対応していないので float32 で補間して元の型に戻す
+    source = frame.astype(np.float32) if frame.dtype == np.float16 else frame
+    shifted = cv2.warpAffine(
+        source,
+        matrix,
+        (width, height),
+        flags=cv2.INTER_LINEAR,
+        borderMode=cv2.BORDER_CONSTANT,
+    )
+    return shifted.astype(frame.dtype, copy=False)
+
+
+class RegisteredFrames:
+    """元のフレーム列にシフト表を適用して返すビュー（表示時に補正する）"""
+
+    def __init__(self, frames, shifts):
+        self.frames = frames
+        self.shifts = shifts
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __getitem__(self, frame_idx):
+        return self.register(frame_idx, self.frames[frame_idx])
+
+    def register(self, frame_idx, frame):
+        """取得済みの元フレームを補正する"""
+        return apply_shift(frame, self.shifts[frame_idx])
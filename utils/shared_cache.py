@@ -0,0 +1,280 @@
+import os
+import threading
+from collections import OrderedDict
+from utils.config import NUM_WORKERS, SHARED_CACHE_MAX_BYTES
+
+
+def file_key(file_path):
+    """ファイルを識別するキー（更新されたファイルは別キーになる）"""
+    stat = os.stat(file_path)
+    return (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+
+
+def frames_nbytes(frames):
+    """デコード済みフレームのメモリ使用量（遅延ソースは0として扱う）"""
+    if isinstance(frames, list):
+        # 同じ内容のフレームは1つのバッファを共有しているので1回だけ数える
+        return sum(f.nbytes for f in {id(f): f for f in frames}.values())
+    # numpy配列（遅延ソースは nbytes を持たない）
+    return getattr(frames, "nbytes", 0)
+
+
+class _FileEntry:
+    """共有キャッシュ内の1ファイル分のエントリ"""
+
+    def __init__(self, key):
+        self.key = key
+        self.frames = None
+        self.frame_count = 0
+        self.nbytes = 0
+        self.loader = None
+        self.load_session = None
+        self.stats = None
+        self.refs = set()  # フレームを参照中のセッション
+        self.waiters = {}  # 読み込み完了を待っているセッション -> コールバック
+
+
+class SharedDecodeCache:
+    """
+    プロセス全体で共有するデコード/エンコード済み画像キャッシュ
+
+    Fletのwebモードで複数セッションが同じファイルを開いた場合でも、
+    デコードは1回だけ行い、フレームとエンコード済み画像を共有する。
+    ファイルはセッションごとに参照カウントされ、全体のメモリ上限を超えると
+    エンコード済み画像、参照されていないファイルの順に古いものから解放される。
+    参照中のファイルのフレームは解放できないため、開いているファイルだけで
+    上限を超えることはある（その間はエンコード済み画像をほとんど保持しない）。
+    セッションごとの使用量は session_usage() で確認できる。
+    """
+
+    def __init__(self, max_bytes=SHARED_CACHE_MAX_BYTES, max_workers=NUM_WORKERS):
+        """
+        初期化
+
+        Args:
+            max_bytes: 解放の目安にするメモリ上限（バイト）。参照中のファイルには適用されない
+            max_workers: ファイル読み込みに使用する最大ワーカー数
+        """
+        self.max_bytes = max_bytes
+        self.max_workers = max_workers
+        self._lock = threading.RLock()
+        self._files = OrderedDict()  # key -> _FileEntry
+        # (key, frame_idx, variant) -> (data, nbytes, session_id)
+        self._encoded = OrderedDict()
+        self._encoded_bytes = 0
+
+    def open(
+        self,
+        file_path,
+        session_id,
+        progress_callback=None,
+        error_callback=None,
+        complete_callback=None,
+    ):
+        """
+        ファイルのフレームを取得する
+
+        デコード済みであれば即座に complete_callback を呼ぶ。他のセッションが
+        読み込み中であればその完了を待ち、どちらでもなければ読み込みを開始する。
+
+        Args:
+            file_path: 読み込むファイルのパス
+            session_id: 呼び出し元セッションの識別子
+            progress_callback: 進捗を通知するコールバック関数 (引数: 進捗率0.0-1.0)
+            error_callback: エラー発生時のコールバック関数 (引数: エラーメッセージ)
+            complete_callback: 完了時のコールバック関数 (引数: フレームリスト, フレーム数, FrameStatsIndex)
+
+        Returns:
+            tuple: ファイルキー（release() に渡す）
+        """
+        try:
+            key = file_key(file_path)
+        except OSError as e:
+            if error_callback:
+                error_callback(f"ファイルを開けませんでした: {str(e)}")
+            return None
+
+        callbacks = (progress_callback, error_callback, complete_callback)
+        with self._lock:
+            entry = self._files.get(key)
+            if entry is None:
+                entry = _FileEntry(key)
+                self._files[key] = entry
+            self._files.move_to_end(key)
+
+            if entry.frames is not None:
+                # デコード済み: 参照を追加してそのまま返す
+                entry.refs.add(session_id)
+                frames, frame_count = entry.frames, entry.frame_count
+                stats = entry.stats
+            else:
+                entry.waiters[session_id] = callbacks
+                if entry.loader is None:
+                    # コーデック系モジュールは最初の読み込み時に import する
+                    from utils.tiff_loader import TiffLoader
+
+                    # 表示設定はLUTで適用するため元のビット深度のまま保持する
+                    loader = TiffLoader(max_workers=self.max_workers, keep_native=True)
+                    entry.loader = loader
+                    entry.load_session = loader.load_tiff(
+                        file_path,
+                        progress_callback=lambda p: self._on_progress(key, loader, p),
+                        error_callback=lambda m: self._on_error(key, loader, m),
+                        complete_callback=lambda f, n: self._on_complete(
+                            key, loader, f, n
+                        ),
+                    )
+                return key
+
+        if complete_callback:
+            complete_callback(frames, frame_count, stats)
+        return key
+
+    def release(self, key, session_id):
+        """セッションによるファイルの参照（または読み込み待ち）を解除する"""
+        if key is None:
+            return
+        with self._lock:
+            entry = self._files.get(key)
+            if entry is None:
+                return
+            entry.refs.discard(session_id)
+            entry.waiters.pop(session_id, None)
+
+            # 誰も待っていない読み込みはキャンセル
+            if entry.frames is None and not entry.waiters:
+                if entry.loader is not None:
+                    entry.loader.stop()
+                self._drop_file(key)
+                return
+            self._evict()
+
+    def get_encoded(self, key, frame_idx, encoder, session_id, variant=None):
+        """
+        エンコード済み画像を取得する（なければ encoder() で作成して共有する）
+
+        Args:
+            key: open() が返したファイルキー
+            frame_idx: フレーム番号
+            encoder: エンコード済み画像（文字列またはバイト列）を返す関数
+            session_id: 呼び出し元セッションの識別子（メモリの計上先）
+            variant: 表示設定など、同じフレームの異なる見た目を区別するキー
+        """
+        if key is None:
+            return encoder()
+
+        cache_key = (key, frame_idx, variant)
+        with self._lock:
+            cached = self._encoded.get(cache_key)
+            if cached is not None:
+                self._encoded.move_to_end(cache_key)
+                return cached[0]
+
+        # エンコードはロックの外で行う（同時に作成された場合は後勝ち）
+        data = encoder()
+        nbytes = len(data)
+        with self._lock:
+            if key not in self._files:
+                return data
+            previous = self._encoded.pop(cache_key, None)
+            if previous is not None:
+                self._encoded_bytes -= previous[1]
+            self._encoded[cache_key] = (data, nbytes, session_id)
+            self._encoded_bytes += nbytes
+            self._evict()
+        return data
+
+    def session_usage(self, session_id):
+        """セッションに計上されるメモリ量（共有フレームは参照数で按分）"""
+        with self._lock:
+            total = 0
+            for entry in self._files.values():
+                if session_id in entry.refs:
+                    total += entry.nbytes // len(entry.refs)
+            for _, nbytes, owner in self._encoded.values():
+                if owner == session_id:
+                    total += nbytes
+            return total
+
+    def total_bytes(self):
+        with self._lock:
+            return self._encoded_bytes + sum(e.nbytes for e in self._files.values())
+
+    def _current_entry(self, key, loader):
+        """loader が現在もそのファイルを読み込んでいる場合のみエントリを返す"""
+        entry = self._files.get(key)
+        if entry is None or entry.loader is not loader:
+            return None
+        return entry
+
+    def _on_progress(self, key, loader, progress):
+        with self._lock:
+            entry = self._current_entry(key, loader)
+            waiters = list(entry.waiters.values()) if entry else []
+        for progress_callback, _, _ in waiters:
+            if progress_callback:
+                progress_callback(progress)
+
+    def _on_error(self, key, loader, message):
+        with self._lock:
+            entry = self._current_entry(key, loader)
+            waiters = list(entry.waiters.values()) if entry else []
+            if entry is not None:
+                self._drop_file(key)
+        for _, error_callback, _ in waiters:
+            if error_callback:
+                error_callback(message)
+
+    def _on_complete(self, key, loader, frames, frame_count):
+        with self._lock:
+            entry = self._current_entry(key, loader)
+            if entry is None:
+                # 待っているセッションがいなくなった
+                if hasattr(frames, "close"):
+                    frames.close()
+                return
+            entry.frames = frames
+            entry.frame_count = frame_count
+            entry.nbytes = frames_nbytes(frames)
+            entry.stats = entry.load_session.stats
+            entry.loader = None
+            entry.load_session = None
+            stats = entry.stats
+            waiters = list(entry.waiters.values())
+            entry.refs.update(entry.waiters)
+            entry.waiters.clear()
+            self._evict()
+        for _, _, complete_callback in waiters:
+            if complete_callback:
+                complete_callback(frames, frame_count, stats)
+
+    def _evict(self):
+        """メモリ上限を超えている間、エンコード済み画像、未参照のファイルの順に解放"""
+        while self._encoded and self.total_bytes() > self.max_bytes:
+            _, (_, nbytes, _) = self._encoded.popitem(last=False)
+            self._encoded_bytes -= nbytes
+
+        for key in list(self._files):
+            if self.total_bytes() <= self.max_bytes:
+                break
+            entry = self._files[key]
+            if not entry.refs and not entry.waiters:
+                self._drop_file(key)
+
+        # 参照されていない遅延ソースはファイルハンドルを保持し続けない
+        for key in list(self._files):
+            entry = self._files[key]
+            if not entry.refs and not entry.waiters and hasattr(entry.frames, "close"):
+                self._drop_file(key)
+
+    def _drop_file(self, key):
+        """ファイルのエントリと、そのエンコード済み画像を解放"""
+        entry = self._files.pop(key)
+        for cache_key in [k for k in self._encoded if k[0] == key]:
+            self._encoded_bytes -= self._encoded.pop(cache_key)[1]
+        if hasattr(entry.frames, "close"):
+            entry.frames.close()
+
+
+# プロセス全体で共有するキャッシュ
+shared_decode_cache = SharedDecodeCache()
@@ -0,0 +1,262 @@
+import threading
+from abc import ABC, abstractmethod
+import numpy as np
+from utils.tiff_loader import TiffLoader
+
+
+class _RingBuffer:
+    """直近 size 枚のフレームを保持するリングバッファ（合計も逐次更新する）"""
+
+    def __init__(self, size):
+        self.size = size
+        self.buffer = None
+        self.total = None
+        self.count = 0
+        self.pos = 0
+
+    def push(self, frame):
+        """フレームを追加し、あふれたフレームの分を合計から差し引く（O(1)）"""
+        if self.buffer is None:
+            self.buffer = np.empty((self.size,) + frame.shape, dtype=np.float32)
+            self.total = np.zeros(frame.shape, dtype=np.float64)
+        if self.count == self.size:
+            self.total -= self.buffer[self.pos]
+        else:
+            self.count += 1
+        self.buffer[self.pos] = frame
+        self.total += frame
+        self.pos = (self.pos + 1) % self.size
+
+    def mean(self):
+        return (self.total / self.count).astype(np.float32)
+
+    def median(self):
+        return np.median(self.buffer[: self.count], axis=0).astype(np.float32)
+
+
+class TemporalStage(ABC):
+    """時間方向フィルタの1段（window 枚前までの入力を参照する）"""
+
+    window = 1
+
+    def reset(self):
+        pass
+
+    @abstractmethod
+    def process(self, frame):
+        """次のフレームを入力し、この段の出力を返す"""
+
+    @property
+    def key(self):
+        return (type(self).__name__, self.window)
+
+
+class BackgroundSubtraction(TemporalStage):
+    """固定の背景画像を差し引く"""
+
+    def __init__(self, background):
+        self.background = np.asarray(background, dtype=np.float32)
+        # 背景画像の内容で区別する（キャッシュキー用）
+        self._fingerprint = (self.background.shape, float(self.background.sum()))
+
+    def process(self, frame):
+        return frame - self.background
+
+    @property
+    def key(self):
+        return (type(self).__name__, self._fingerprint)
+
+
+class SlidingMean(TemporalStage):
+    """直近 window 枚の移動平均（合計を逐次更新するので1フレームあたりO(1)）"""
+
+    def __init__(self, window):
+        self.window = max(1, int(window))
+        self.reset()
+
+    def reset(self):
+        self._ring = _RingBuffer(self.window)
+
+    def process(self, frame):
+        self._ring.push(frame)
+        return self._ring.mean()
+
+
+class SlidingMedian(TemporalStage):
+    """直近 window 枚の移動中央値（リングバッファ上で計算）"""
+
+    def __init__(self, window):
+        self.window = max(1, int(window))
+        self.reset()
+
+    def reset(self):
+        self._ring = _RingBuffer(self.window)
+
+    def process(self, frame):
+        self._ring.push(frame)
+        return self._ring.median()
+
+
+class DeltaFOverF(TemporalStage):
+    """
+    ΔF/F = (F - F0) / F0
+
+    ベースライン F0 は直前 window 枚の移動平均（現在のフレームは含まない）。
+    """
+
+    def __init__(self, window, epsilon=1e-6):
+        self.window = max(1, int(window)) + 1
+        self.epsilon = epsilon
+        self.reset()
+
+    def reset(self):
+        self._ring = _RingBuffer(self.window - 1)
+
+    def process(self, frame):
+        baseline = self._ring.mean() if self._ring.count else frame
+        self._ring.push(frame)
+        return (frame - baseline) / np.maximum(baseline, self.epsilon)
+
+
+class TemporalPipeline:
+    """
+    デコードと表示の間に入るフレームごとの時間方向フィルタ
+
+    連続したフレームを順に要求された場合は各段の累積値を逐次更新するだけなので、
+    再生中の追加コストは1フレームあたりO(1)。窓より短い前方への移動（間引き再生や
+    エンコード済み画像のキャッシュで飛ばしたフレーム）は間のフレームを入力して
+    窓をずらすだけなので、移動量に比例したコストで済む。後方への移動と窓以上の
+    移動（逆再生・シーク）では直前 window-1 枚を読み直して累積値を作り直すため、
+    1回あたりO(window)になる。
+    """
+
+    def __init__(self, stages, get_frame=None):
+        """
+        初期化
+
+        Args:
+            stages: TemporalStage のリスト（先頭から順に適用）
+            get_frame: フレーム番号から元のフレームを返す関数（シーク時に使用）
+        """
+        self.stages = list(stages)
+        self.get_frame = get_frame
+        self._lock = threading.Lock()
+        self._last_idx = None
+        self._last_output = None
+
+    @property
+    def window(self):
+        """全段を通して参照する過去フレームの枚数"""
+        return sum(stage.window - 1 for stage in self.stages) + 1
+
+    @property
+    def key(self):
+        """設定を表すキー（エンコード済み画像のキャッシュに使用）"""
+        return tuple(stage.key for stage in self.stages)
+
+    def reset(self):
+        with self._lock:
+            self._reset()
+
+    def _reset(self):
+        for stage in self.stages:
+            stage.reset()
+        self._last_idx = None
+        self._last_output = None
+
+    def _push(self, frame):
+        output = np.asarray(frame, dtype=np.float32)
+        for stage in self.stages:
+            output = stage.process(output)
+        return output
+
+    def get(self, frame_idx, frame=None):
+        """
+        フィルタ適用後のフレームを返す
+
+        Args:
+            frame_idx: フレーム番号
+            frame: frame_idx の元フレーム（Noneの場合は get_frame で取得）
+        """
+        with self._lock:
+            if frame_idx == self._last_idx:
+                return self._last_output
+
+            step = None if self._last_idx is None else frame_idx - self._last_idx
+            if step is not None and 0 < step < self.window:
+                # 窓より短い前方への移動: 間のフレームを入力して窓をずらす
+                for idx in range(self._last_idx + 1, frame_idx):
+                    self._push(self.get_frame(idx))
+            elif step != 1:
+                # 後方への移動・窓以上の移動: 直前 window-1 枚で累積値を作り直す
+                self._reset()
+                for idx in range(max(0, frame_idx - self.window + 1), frame_idx):
+                    self._push(self.get_frame(idx))
+
+            if frame is None:
+                frame = self.get_frame(frame_idx)
+            self._last_output = self._push(frame)
+            self._last_idx = frame_idx
+            return self._last_output
+
+    def iter_frames(self, frames):
+        """
+        フレームの反復子に順にフィルタを適用する（ヘッドレス処理用）
+
+        累積値を作り直すため、再生で使っているものとは別のインスタンスで呼ぶこと。
+        """
+        self.reset()
+        for frame in frames:
+            yield self._push(frame)
+        self.reset()
+
+
+def background_from_frames(frames, count):
+    """先頭 count 枚の平均を背景画像として求める"""
+    ring = _RingBuffer(max(1, min(count, len(frames))))
+    for idx in range(ring.size):
+        ring.push(frames[idx])
+    return ring.mean()
+
+
+def build_stages(name, window, frames):
+    """
+    表示名（config.TEMPORAL_FILTERS）からフィルタ段のリストを作成
+
+    Args:
+        name: フィルタの表示名
+        window: 移動窓の枚数（背景減算では背景の平均に使う先頭フレーム数）
+        frames: 元フレームの列（背景画像の計算に使用）
+    """
+    if name == "背景減算":
+        return [BackgroundSubtraction(background_from_frames(frames, window))]
+    if name == "移動平均":
+        return [SlidingMean(window)]
+    if name == "移動中央値":
+        return [SlidingMedian(window)]
+    if name == "ΔF/F":
+        return [DeltaFOverF(window)]
+    return []
+
+
+def iter_filtered_stack(file_path, stages, start=0, stop=None, chunk_size=16):
+    """
+    TIFFスタックをストリーム読み込みしながらフィルタ適用後のフレームを順に返す
+
+    start より前の window-1 枚は累積値の準備にだけ使い、出力しない。
+
+    Yields:
+        tuple: (フレーム番号, フィルタ適用後のフレーム)
+    """
+    pipeline = TemporalPipeline(stages)
+    warmup_start = max(0, start - pipeline.window + 1)
+
+    def frames():
+        for _, chunk in TiffLoader.iter_page_chunks(
+            file_path, warmup_start, stop, chunk_size
+        ):
+            yield from chunk
+
+    for frame_idx, output in enumerate(pipeline.iter_frames(frames()), warmup_start):
+        if frame_idx >= start:
+            yield frame_idx, output
@@ -1,10 +1,84 @@
 import threading
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, wait
 import numpy as np
 import cv2
 import tifffile
 import os
 import warnings
+from utils.display_scale import estimate_range, scale_to_uint8
+from utils.frame_stats import FrameStatsIndex
+from utils.video_source import VideoFrameSource, decode_segmented, is_video_file
+
+# 連続配置のスタックを一括読み込みするときの1回の読み出しサイズ（進捗通知とキャンセルの単位）
+_BULK_READ_BYTES = 64 * 1024**2
+
+
+class LoadSession:
+    """
+    1回分の読み込み処理を表すセッション（世代トークン付き）
+
+    新しいセッションが開始されると古いセッションはキャンセルされ、
+    その結果はコールバックに渡されない。
+    """
+
+    def __init__(
+        self,
+        generation,
+        file_path,
+        progress_callback=None,
+        error_callback=None,
+        complete_callback=None,
+    ):
+        self.generation = generation
+        self.file_path = file_path
+        self.progress_callback = progress_callback
+        self.error_callback = error_callback
+        self.complete_callback = complete_callback
+        self.stop_event = threading.Event()
+        self.executor = None
+        self.stats = None  # FrameStatsIndex（tifffileで読み込んだ場合のみ）
+
+    @property
+    def cancelled(self):
+        return self.stop_event.is_set()
+
+    def cancel(self):
+        """待機中のタスクを破棄し、実行中のタスクに停止を通知する"""
+        self.stop_event.set()
+        executor = self.executor
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+class _WorkerTiffFiles:
+    """
+    ワーカースレッドごとに開いた TiffFile
+
+    1つの TiffFile を複数スレッドから読むとファイル位置が競合し、
+    別のページのデータや壊れた圧縮データを読んでしまうため、スレッドごとに開く。
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._opened = []
+
+    def get(self):
+        """呼び出し元スレッドの TiffFile（初回は開く）"""
+        tif = getattr(self._local, "tif", None)
+        if tif is None:
+            tif = tifffile.TiffFile(self.file_path)
+            self._local.tif = tif
+            with self._lock:
+                self._opened.append(tif)
+        return tif
+
+    def close(self):
+        with self._lock:
+            opened, self._opened = self._opened, []
+        for tif in opened:
+            tif.close()
 
 
 class TiffLoader:
@@ -12,21 +86,24 @@ class TiffLoader:
     マルチスレッドTIFF読み込み処理クラス（エラー処理強化版）
     """
 
-    def __init__(self, max_workers=None):
+    def __init__(self, max_workers=None, keep_native=False):
         """
         初期化
 
         Args:
             max_workers: スレッドプールで使用する最大ワーカー数
                         Noneの場合はCPUコア数-1 (デフォルト)
+            keep_native: Trueの場合、16ビット以下の整数と32ビット以下の浮動小数点
+                        （float16/float32）のグレースケール画像は、RGBに変換せず
+                        元の型のまま返す（表示時にLUTで変換する）
         """
-        self.max_workers = (
-            max_workers if max_workers is not None else os.cpu_count() - 1
+        self.max_workers = max(
+            1, max_workers if max_workers is not None else os.cpu_count() - 1
         )
-        self._stop_event = threading.Event()
-        self._progress_callback = None
-        self._error_callback = None
-        self._complete_callback = None
+        self.keep_native = keep_native
+        self._session_lock = threading.Lock()
+        self._generation = 0
+        self._session = None
 
     def load_tiff(
         self,
@@ -38,29 +115,154 @@ class TiffLoader:
         """
         TIFFファイルを非同期に読み込む
 
+        実行中の読み込みがあればキャンセルしてから新しいセッションを開始する。
+
         Args:
             file_path: 読み込むTIFFファイルのパス
             progress_callback: 進捗を通知するコールバック関数 (引数: 進捗率0.0-1.0)
             error_callback: エラー発生時のコールバック関数 (引数: エラーメッセージ)
             complete_callback: 完了時のコールバック関数 (引数: フレームリスト, フレーム数)
+
+        Returns:
+            LoadSession: 開始したセッション
         """
-        self._progress_callback = progress_callback
-        self._error_callback = error_callback
-        self._complete_callback = complete_callback
-        self._stop_event.clear()
+        with self._session_lock:
+            if self._session is not None:
+                self._session.cancel()
+            self._generation += 1
+            session = LoadSession(
+                self._generation,
+                file_path,
+                progress_callback=progress_callback,
+                error_callback=error_callback,
+                complete_callback=complete_callback,
+            )
+            self._session = session
 
         # 別スレッドで読み込み処理を開始
         threading.Thread(
-            target=self._load_tiff_thread, args=(file_path,), daemon=True
+            target=self._load_tiff_thread, args=(session,), daemon=True
         ).start()
+        return session
+
+    @staticmethod
+    def iter_page_chunks(
+        file_path, start=0, stop=None, chunk_size=16, stop_event=None, step=1
+    ):
+        """
+        ページを chunk_size 枚ずつ順に読み出す（全フレームをメモリに載せないストリーム読み込み）
+
+        Args:
+            file_path: TIFFファイルのパス
+            start: 先頭ページ番号
+            stop: 終端ページ番号（含まない）。Noneの場合は最後まで
+            chunk_size: 1回に読み出すページ数
+            stop_event: セットされると読み出しを中断するイベント
+            step: ページの間引き間隔（読み飛ばすページはデコードしない）
+
+        Yields:
+            tuple: (先頭ページ番号, (枚数, H, W[, C]) の配列)
+        """
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UserWarning)
+            with tifffile.TiffFile(file_path) as tif:
+                total = len(tif.pages)
+                stop = total if stop is None else min(stop, total)
+                for offset in range(start, stop, chunk_size * step):
+                    if stop_event is not None and stop_event.is_set():
+                        return
+                    key = range(offset, min(offset + chunk_size * step, stop), step)
+                    chunk = tif.asarray(key=key)
+                    # 1ページだけのときもページ軸を持たせる
+                    yield offset, chunk.reshape((len(key),) + tif.pages[offset].shape)
+
+    def read_preview(self, file_path, count=8, stop_event=None):
+        """
+        ファイルのフレーム数と先頭フレームだけを読み込む（プレイリストの先読み用）
+
+        TIFFはIFDを最後まで走査してフレーム数を求め、先頭 count 枚をデコードして
+        統計を集計する。動画はキーフレームインデックスを作成せず、先頭から count 枚を読む。
+        フレームは load_tiff() と同じ形式（keep_native の指定に従う）で返す。
+
+        Args:
+            file_path: ファイルのパス
+            count: 読み込む先頭フレームの最大数
+            stop_event: セットされると読み込みを中断するイベント
+
+        Returns:
+            tuple: (総フレーム数, 先頭フレームのリスト, 先頭フレームの FrameStatsIndex)。
+                   中断された場合は None
+        """
+        frames = []
+        if is_video_file(file_path):
+            cap = cv2.VideoCapture(file_path)
+            try:
+                if not cap.isOpened():
+                    raise IOError("OpenCVで動画ファイルを開けませんでした")
+                total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+                while len(frames) < count:
+                    if stop_event is not None and stop_event.is_set():
+                        return None
+                    ret, frame = cap.read()
+                    if not ret:
+                        break
+                    frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+            finally:
+                cap.release()
+            stats = FrameStatsIndex(len(frames))
+            for i, frame in enumerate(frames):
+                stats.update(i, frame)
+            return max(total_frames, len(frames)), frames, stats
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UserWarning)
+            with tifffile.TiffFile(file_path) as tif:
+                total_frames = len(tif.pages)
+                stats = FrameStatsIndex(min(count, total_frames))
+                for i in range(len(stats)):
+                    if stop_event is not None and stop_event.is_set():
+                        return None
+                    img = tif.pages[i].asarray()
+                    value_range = stats.update(i, img)
+                    if not (self.keep_native and self._is_native_displayable(img)):
+                        img = self._convert_to_rgb(img, value_range)
+                    frames.append(img)
+        return total_frames, frames, stats
 
     def stop(self):
         """読み込み処理を停止する"""
-        self._stop_event.set()
-
-    def _load_tiff_thread(self, file_path):
+        with self._session_lock:
+            if self._session is not None:
+                self._session.cancel()
+                self._session = None
+
+    def is_current(self, session):
+        """セッションが最新かつ有効かどうか"""
+        with self._session_lock:
+            return session is self._session and not session.cancelled
+
+    def _notify_progress(self, session, progress):
+        if session.progress_callback and self.is_current(session):
+            session.progress_callback(progress)
+
+    def _notify_error(self, session, message):
+        if session.error_callback and self.is_current(session):
+            session.error_callback(message)
+
+    def _notify_complete(self, session, frames, frame_count):
+        if session.complete_callback and self.is_current(session):
+            session.complete_callback(frames, frame_count)
+            return True
+        return False
+
+    def _load_tiff_thread(self, session):
         """TIFFファイル読み込みスレッド"""
+        file_path = session.file_path
         try:
+            # 動画コンテナは全フレームをデコードせず遅延フレームソースとして開く
+            if is_video_file(file_path):
+                return self._open_video_source(session)
+
             # tifffileの警告を一時的に抑制
             with warnings.catch_warnings():
                 warnings.simplefilter("ignore", UserWarning)
@@ -69,87 +271,298 @@ class TiffLoader:
                 try:
                     with tifffile.TiffFile(file_path) as tif:
                         # エラーが出やすいタグ処理をスキップするオプションを使用
-                        return self._process_with_tifffile(tif)
+                        return self._process_with_tifffile(tif, session)
                 except Exception as tiff_err:
+                    if session.cancelled:
+                        return False
                     print(f"tifffileでの読み込みに失敗: {str(tiff_err)}")
                     # tifffileでの読み込みに失敗した場合は、OpenCVで試みる
-                    return self._process_with_opencv(file_path)
+                    return self._process_with_opencv(file_path, session)
 
         except Exception as e:
             print(f"TIFFファイルの読み込みエラー: {str(e)}")
-            if self._error_callback:
-                self._error_callback(f"TIFFファイルの読み込みエラー: {str(e)}")
+            self._notify_error(session, f"TIFFファイルの読み込みエラー: {str(e)}")
 
-    def _process_with_tifffile(self, tif):
+    def _process_with_tifffile(self, tif, session):
         """tifffileライブラリを使ってTIFFを処理"""
+        # 非圧縮で全ページが連続して並んでいる場合は一括読み込み
+        layout = self._contiguous_layout(tif)
+        if layout is not None:
+            return self._process_contiguous(tif, session, *layout)
+
         try:
             total_frames = len(tif.pages)
             frames = [None] * total_frames  # 結果を格納する配列を事前に確保
 
             if total_frames == 0:
-                if self._error_callback:
-                    self._error_callback("フレームが見つかりませんでした")
+                self._notify_error(session, "フレームが見つかりませんでした")
                 return False
 
             print(f"総フレーム数: {total_frames}")
             print(f"使用スレッド数: {self.max_workers}")
 
-            # ThreadPoolExecutorを使用して並列処理
-            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-                # 各フレームの読み込みをスケジュール
-                futures = {}
-                for i in range(total_frames):
-                    if self._stop_event.is_set():
-                        break
+            # デコードと同時にフレーム統計を集計する
+            stats = FrameStatsIndex(total_frames)
+            worker_files = _WorkerTiffFiles(session.file_path)
 
-                    # 各フレームをスレッドプールで読み込む
-                    future = executor.submit(self._load_frame_safe, tif, i)
-                    futures[future] = i
-
-                # 完了したフューチャーを処理
-                completed = 0
-                for future in futures:
-                    if self._stop_event.is_set():
-                        break
+            try:
+                # ThreadPoolExecutorを使用して並列処理
+                with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                    # キャンセル時に待機中のタスクを破棄できるようセッションに登録
+                    session.executor = executor
+
+                    # 各フレームの読み込みをスケジュール
+                    futures = {}
+                    for i in range(total_frames):
+                        if session.cancelled:
+                            break
+
+                        # 各フレームをスレッドプールで読み込む
+                        try:
+                            future = executor.submit(
+                                self._load_frame_safe, worker_files, i, session, stats
+                            )
+                        except RuntimeError:
+                            # キャンセルによりシャットダウン済み
+                            break
+                        futures[future] = i
+
+                    # 完了したフューチャーを処理
+                    completed = 0
+                    for future in futures:
+                        if session.cancelled:
+                            break
+
+                        try:
+                            frame_idx = futures[future]
+                            frame_result = future.result()
+
+                            # フレーム読み込みに成功した場合
+                            if frame_result is not None:
+                                frames[frame_idx] = frame_result
+                                completed += 1
+
+                                # 進捗通知
+                                self._notify_progress(session, completed / total_frames)
+                            else:
+                                print(f"フレーム {frame_idx} の読み込みに失敗")
+
+                        except Exception as e:
+                            print(f"フレーム {futures[future]} の処理エラー: {str(e)}")
+
+                    session.executor = None
+            finally:
+                worker_files.close()
+
+            # キャンセルされた場合はバッファをすぐに解放して結果を破棄する
+            if session.cancelled:
+                frames.clear()
+                return False
 
-                    try:
-                        frame_idx = futures[future]
-                        frame_result = future.result()
-
-                        # フレーム読み込みに成功した場合
-                        if frame_result is not None:
-                            frames[frame_idx] = frame_result
-                            completed += 1
-
-                            # 進捗通知
-                            if self._progress_callback:
-                                self._progress_callback(completed / total_frames)
-                        else:
-                            print(f"フレーム {frame_idx} の読み込みに失敗")
-
-                    except Exception as e:
-                        print(f"フレーム {futures[future]} の処理エラー: {str(e)}")
-
-            # 読み込みに成功したフレームのみを返す
-            valid_frames = [f for f in frames if f is not None]
-            if len(valid_frames) > 0:
-                print(f"読み込み成功: {len(valid_frames)}/{total_frames}フレーム")
-                if self._complete_callback:
-                    self._complete_callback(valid_frames, len(valid_frames))
-                return True
-            else:
+            loaded = next((f for f in frames if f is not None), None)
+            if loaded is None:
                 print("有効なフレームが読み込めませんでした")
-                if self._error_callback:
-                    self._error_callback("有効なフレームが読み込めませんでした")
+                self._notify_error(session, "有効なフレームが読み込めませんでした")
                 return False
 
+            # フレーム番号をページ番号と一致させるため、読み込めなかったフレームは
+            # 詰めずに黒いフレームで埋める（統計は無効のまま残して報告に使う）
+            missing = [i for i, f in enumerate(frames) if f is None]
+            if missing:
+                print(f"読み込めなかったフレーム: {len(missing)}/{total_frames}")
+                blank = np.zeros_like(loaded)
+                for i in missing:
+                    frames[i] = blank
+                    stats.valid[i] = False
+            print(f"読み込み成功: {completed}/{total_frames}フレーム")
+            session.stats = stats
+            frames = self._share_duplicates(frames, stats)
+            self._notify_complete(session, frames, total_frames)
+            return True
+
         except Exception as e:
             print(f"tifffile処理エラー: {str(e)}")
-            if self._error_callback:
-                self._error_callback(f"tifffile処理エラー: {str(e)}")
+            self._notify_error(session, f"tifffile処理エラー: {str(e)}")
+            return False
+
+    @staticmethod
+    def _contiguous_layout(tif):
+        """
+        全ページが非圧縮で先頭から隙間なく並んでいるかを調べる
+
+        Returns:
+            tuple: (データの開始位置, フレーム数, フレームの形状, ファイル上のdtype)。
+                   該当しない場合は None
+        """
+        try:
+            series = tif.series[0]
+            page = tif.pages[0]
+            frame_count = len(tif.pages)
+            if (
+                series.dataoffset is None
+                or page.dtype is None
+                or page.planarconfig != 1
+                or page.bitspersample != page.dtype.itemsize * 8
+            ):
+                return None
+            frame_size = int(np.prod(page.shape))
+            if series.size != frame_count * frame_size:
+                return None
+            dtype = np.dtype(page.dtype).newbyteorder(tif.byteorder)
+            return series.dataoffset, frame_count, page.shape, dtype
+        except Exception:
+            return None
+
+    def _process_contiguous(self, tif, session, offset, frame_count, shape, dtype):
+        """
+        連続配置の非圧縮スタックを1つの (N, H, W[, C]) 配列へ一括で読み込む
+
+        ページごとのデコードや配列確保を行わず、確保済みのバッファへ readinto で
+        順に読み出すので、ディスクの転送速度で読み込める。フレーム統計は読み終わった
+        フレームから順にワーカーで集計し、読み込みと並行して進める。
+        """
+        print(f"総フレーム数: {frame_count}（連続配置のため一括読み込み）")
+        try:
+            # バイト順が異なるファイルはフレームごとに入れ替えてから集計する
+            swap = not dtype.isnative
+            block = np.empty(
+                (frame_count,) + tuple(shape), dtype=dtype.newbyteorder("=")
+            )
+            raw = block.reshape(-1).view(np.uint8)
+            frame_bytes = raw.nbytes // frame_count
+            stats = FrameStatsIndex(frame_count)
+
+            def update_stats(i):
+                if session.cancelled:
+                    return
+                if swap:
+                    block[i].byteswap(inplace=True)
+                stats.update(i, block[i])
+
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                # キャンセル時に待機中のタスクを破棄できるようセッションに登録
+                session.executor = executor
+                futures = []
+                with open(tif.filehandle.path, "rb", buffering=0) as f:
+                    f.seek(offset)
+                    pos = 0
+                    while pos < raw.nbytes:
+                        if session.cancelled:
+                            return False
+                        read = f.readinto(memoryview(raw[pos : pos + _BULK_READ_BYTES]))
+                        if not read:
+                            raise IOError("ファイルの終端に達しました")
+                        complete = (pos + read) // frame_bytes
+                        futures.extend(
+                            executor.submit(update_stats, i)
+                            for i in range(pos // frame_bytes, complete)
+                        )
+                        pos += read
+                        # 読み込みを進捗の9割として通知
+                        self._notify_progress(session, 0.9 * pos / raw.nbytes)
+                wait(futures)
+            if session.cancelled:
+                return False
+            for future in futures:
+                # 集計中の例外を伝える
+                future.result()
+            session.stats = stats
+
+            frames = self._share_duplicates(
+                self._frames_from_block(block, stats), stats
+            )
+        except Exception as e:
+            print(f"一括読み込みエラー: {str(e)}")
+            self._notify_error(session, f"一括読み込みエラー: {str(e)}")
+            return False
+
+        if session.cancelled:
+            return False
+        print(f"読み込み成功: {frame_count}/{frame_count}フレーム")
+        self._notify_progress(session, 1.0)
+        self._notify_complete(session, frames, frame_count)
+        return True
+
+    @staticmethod
+    def _share_duplicates(frames, stats, compact_ratio=0.1):
+        """
+        同じ内容のフレームが1つのバッファを共有するようにする
+
+        リストでは重複フレームを最初のフレームへの参照に置き換える。1つの配列の場合は
+        詰め直しにコピーが必要なため、重複が全体の compact_ratio 以上のときだけ
+        重複を除いた配列を作り、そのビューのリストにする。
+        """
+        duplicate_of = stats.find_duplicates(frames)
+        count = stats.duplicate_count()
+        if count == 0:
+            return frames
+        print(f"重複フレーム: {count}/{len(frames)}フレーム")
+        if isinstance(frames, list):
+            return [frames[i] for i in duplicate_of]
+        if count < compact_ratio * len(frames):
+            return frames
+        unique = np.flatnonzero(duplicate_of == np.arange(len(frames)))
+        views = dict(zip(unique, frames[unique]))
+        return [views[i] for i in duplicate_of]
+
+    def _frames_from_block(self, block, stats):
+        """
+        一括で読み込んだ配列を表示用のフレーム列にする
+
+        LUTで直接表示できる場合は配列をそのまま返す。グレースケールは
+        フレームごとの [最小値, 最大値] で8ビットに正規化し、1つの (N, H, W, 3) 配列に書き込む。
+        """
+        if self.keep_native and self._is_native_displayable(block[0]):
+            return block
+        if block.ndim == 4:
+            if block.dtype == np.uint8 and block.shape[3] == 3:
+                return block
+            return [
+                self._convert_to_rgb(img, stats.value_range(i))
+                for i, img in enumerate(block)
+            ]
+
+        out = np.empty(block.shape + (3,), dtype=np.uint8)
+        if block.dtype == np.uint8:
+            out[:] = block[:, :, :, None]
+            return out
+        gray = np.empty(block.shape[1:], dtype=np.uint8)
+        for i, img in enumerate(block):
+            # 値が一定のフレームは黒、NaNは0になる
+            scale_to_uint8(img, *stats.value_range(i), out=gray)
+            out[i] = gray[:, :, None]
+        return out
+
+    def _open_video_source(self, session):
+        """動画コンテナをキーフレームインデックス付きのフレームソースとして開く"""
+        try:
+            source = VideoFrameSource(
+                session.file_path,
+                progress_callback=lambda p: self._notify_progress(session, p),
+                stop_event=session.stop_event,
+            )
+        except Exception as e:
+            print(f"動画ファイルを開けませんでした: {str(e)}")
+            self._notify_error(session, f"動画ファイルを開けませんでした: {str(e)}")
+            return False
+
+        if session.cancelled:
+            source.close()
+            return False
+
+        if len(source) == 0:
+            source.close()
+            self._notify_error(session, "フレームが見つかりませんでした")
             return False
 
-    def _process_with_opencv(self, file_path):
+        print(f"動画インデックス作成完了: {source!r}")
+        if not self._notify_complete(session, source, len(source)):
+            # 古いセッションの結果は破棄
+            source.close()
+            return False
+        return True
+
+    def _process_with_opencv(self, file_path, session):
         """OpenCVを使用してTIFFを処理"""
         try:
             print(f"OpenCVで読み込みを試みます: {file_path}")
@@ -157,8 +570,7 @@ class TiffLoader:
             # OpenCVでビデオキャプチャを開く
             cap = cv2.VideoCapture(file_path)
             if not cap.isOpened():
-                if self._error_callback:
-                    self._error_callback("OpenCVでファイルを開けませんでした")
+                self._notify_error(session, "OpenCVでファイルを開けませんでした")
                 return False
 
             # フレーム数を取得
@@ -170,7 +582,7 @@ class TiffLoader:
                 frame_idx = 0
 
                 while True:
-                    if self._stop_event.is_set():
+                    if session.cancelled:
                         break
 
                     ret, frame = cap.read()
@@ -183,70 +595,116 @@ class TiffLoader:
                     frame_idx += 1
 
                     # 進捗の概算（フレーム数が不明のため正確ではない）
-                    if self._progress_callback and frame_idx % 10 == 0:
-                        self._progress_callback(0.5)  # 仮の進捗
+                    if frame_idx % 10 == 0:
+                        self._notify_progress(session, 0.5)  # 仮の進捗
             else:
-                # フレーム数が分かっている場合
-                frames = []
-                for i in range(total_frames):
-                    if self._stop_event.is_set():
-                        break
-
-                    ret, frame = cap.read()
-                    if not ret:
-                        break
-
-                    # BGRからRGBに変換
-                    frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                    frames.append(frame_rgb)
-
-                    # 進捗通知
-                    if self._progress_callback:
-                        self._progress_callback((i + 1) / total_frames)
+                # フレーム数が分かっている場合は複数のキャプチャで並列デコードを試みる
+                frames = None
+                if self.max_workers > 1:
+                    try:
+                        frames = decode_segmented(
+                            file_path,
+                            0,
+                            total_frames,
+                            max_workers=self.max_workers,
+                            progress_callback=lambda p: self._notify_progress(
+                                session, p
+                            ),
+                            stop_event=session.stop_event,
+                        )
+                    except Exception as seg_err:
+                        # シークできないファイルは逐次読み込みにフォールバック
+                        print(f"並列デコードに失敗: {str(seg_err)}")
+                        frames = None
+
+                if frames is None:
+                    frames = []
+                    for i in range(total_frames):
+                        if session.cancelled:
+                            break
+
+                        ret, frame = cap.read()
+                        if not ret:
+                            break
+
+                        # BGRからRGBに変換
+                        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                        frames.append(frame_rgb)
+
+                        # 進捗通知
+                        self._notify_progress(session, (i + 1) / total_frames)
 
             # キャプチャをリリース
             cap.release()
 
+            # キャンセルされた場合はバッファをすぐに解放して結果を破棄する
+            if session.cancelled:
+                frames = None
+                return False
+
             # 読み込み結果を確認
             if len(frames) > 0:
                 print(f"OpenCVで読み込み成功: {len(frames)}フレーム")
-                if self._complete_callback:
-                    self._complete_callback(frames, len(frames))
+                self._notify_complete(session, frames, len(frames))
                 return True
             else:
                 print("OpenCVでフレームを読み込めませんでした")
-                if self._error_callback:
-                    self._error_callback("OpenCVでフレームを読み込めませんでした")
+                self._notify_error(session, "OpenCVでフレームを読み込めませんでした")
                 return False
 
         except Exception as e:
             print(f"OpenCV処理エラー: {str(e)}")
-            if self._error_callback:
-                self._error_callback(f"OpenCV処理エラー: {str(e)}")
+            self._notify_error(session, f"OpenCV処理エラー: {str(e)}")
             return False
 
-    def _load_frame_safe(self, tif, frame_idx):
+    def _load_frame_safe(self, worker_files, frame_idx, session, stats=None):
         """安全にフレームを読み込む（エラー処理付き）"""
+        # キャンセル済みのセッションではデコードしない
+        if session.cancelled:
+            return None
         try:
             # エラーが出ても続行できるように例外をキャッチ
-            page = tif.pages[frame_idx]
+            page = worker_files.get().pages[frame_idx]
             img = page.asarray()
-            return self._convert_to_rgb(img)
+            if stats is None:
+                return self._convert_to_rgb(img)
+            # 統計の集計で得た最小値・最大値を正規化に使い、画素の再走査を省く
+            value_range = stats.update(frame_idx, img)
+            if self.keep_native and self._is_native_displayable(img):
+                return img
+            return self._convert_to_rgb(img, value_range)
         except Exception as e:
             print(f"フレーム {frame_idx} 読み込みエラー: {str(e)}")
             return None
 
-    def _convert_to_rgb(self, img):
-        """画像をRGBフォーマットに変換"""
+    @staticmethod
+    def _is_native_displayable(img):
+        """
+        元の型のままLUTで表示できる画像かどうか
+
+        16ビット以下の整数と、32ビット以下の浮動小数点のグレースケール画像が対象。
+        浮動小数点はDisplayLUTが表示範囲で8ビット化するので、表示調整で値域を変えられる。
+        """
+        if img.ndim != 2:
+            return False
+        if img.dtype.kind in "ui":
+            return img.dtype.itemsize <= 2
+        return img.dtype.kind == "f" and img.dtype.itemsize <= 4
+
+    def _convert_to_rgb(self, img, value_range=None):
+        """
+        画像をRGBフォーマットに変換
+
+        Args:
+            img: 変換する画像
+            value_range: 正規化に使う (最小値, 最大値)。Noneの場合は間引いた画素から推定
+        """
         try:
-            # 16ビット以上の整数データ型の場合、8ビットに変換
+            # uint8以外（16ビット以上の整数・符号付き整数・浮動小数点）は8ビットに変換
             if img.dtype != np.uint8:
-                min_val = np.min(img)
-                max_val = np.max(img)
-                if max_val > min_val:  # ゼロ除算を防ぐ
-                    img = ((img - min_val) / (max_val - min_val) * 255).astype(np.uint8)
-                else:
-                    img = np.zeros(img.shape, dtype=np.uint8)
+                if value_range is None:
+                    value_range = estimate_range(img)
+                img = scale_to_uint8(img, *value_range)
 
             # グレースケールをRGBに変換
             if img.ndim == 2:
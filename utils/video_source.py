@@ -0,0 +1,362 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import cv2
+from utils.config import VIDEO_EXTENSIONS
+from utils.parallel import ProgressCounter
+
+
+def is_video_file(file_path):
+    """動画コンテナとして扱うファイルかどうか"""
+    return os.path.splitext(file_path)[1].lower().lstrip(".") in VIDEO_EXTENSIONS
+
+
+class VideoFrameSource:
+    """
+    動画コンテナを遅延読み込みするフレームソース
+
+    開いた時点でキーフレーム/タイムスタンプのインデックスを作成し、
+    フレーム要求時は直前のキーフレームへシークしてから前方にデコードする。
+    リストと同様に len() と添字アクセスでRGBフレームを取得できる。
+    """
+
+    def __init__(
+        self, file_path, cache_size=32, progress_callback=None, stop_event=None
+    ):
+        """
+        初期化
+
+        Args:
+            file_path: 動画ファイルのパス
+            cache_size: デコード済みフレームを保持する最大数
+            progress_callback: インデックス作成の進捗を通知するコールバック関数 (引数: 進捗率0.0-1.0)
+            stop_event: セットされるとインデックス作成を中断するイベント
+        """
+        self.file_path = file_path
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+
+        self._cap = cv2.VideoCapture(file_path)
+        if not self._cap.isOpened():
+            raise IOError("OpenCVで動画ファイルを開けませんでした")
+
+        self.fps = self._cap.get(cv2.CAP_PROP_FPS) or 0.0
+        self.width = int(self._cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self._cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+        self.keyframes, self.timestamps = self._build_index(
+            progress_callback, stop_event
+        )
+        self.frame_count = len(self.timestamps)
+
+        # 次に read() したときに得られるフレーム番号
+        self._next_pos = 0
+
+    def _build_index(self, progress_callback, stop_event):
+        """パケットをデコードせずに走査してキーフレームとタイムスタンプを収集"""
+        expected = int(self._cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        keyframes = []
+        timestamps = []
+
+        # CAP_PROP_FORMAT=-1 で生パケットのまま読み進める（デコードしないので高速）
+        raw = cv2.VideoCapture(
+            self.file_path, cv2.CAP_FFMPEG, [cv2.CAP_PROP_FORMAT, -1]
+        )
+        try:
+            if raw.isOpened():
+                while raw.grab():
+                    if stop_event is not None and stop_event.is_set():
+                        break
+                    if raw.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME):
+                        keyframes.append(len(timestamps))
+                    timestamps.append(raw.get(cv2.CAP_PROP_POS_MSEC))
+
+                    if (
+                        progress_callback
+                        and expected > 0
+                        and len(timestamps) % 100 == 0
+                    ):
+                        progress_callback(min(1.0, len(timestamps) / expected))
+        finally:
+            raw.release()
+
+        if not timestamps:
+            # 生パケットを読めないバックエンドではコンテナのメタデータから推定
+            fps = self.fps if self.fps > 0 else 30.0
+            timestamps = np.arange(max(0, expected)) * 1000.0 / fps
+
+        # パケットはデコード順なので表示順に並べ替える
+        timestamps = np.sort(np.asarray(timestamps, dtype=np.float64))
+        keyframes = np.asarray(keyframes, dtype=np.int64)
+        return keyframes, timestamps
+
+    def __len__(self):
+        return self.frame_count
+
+    def __getitem__(self, frame_idx):
+        return self.get_frame(frame_idx)
+
+    def __repr__(self):
+        return (
+            f"VideoFrameSource({os.path.basename(self.file_path)!r}, "
+            f"frames={self.frame_count}, keyframes={len(self.keyframes)})"
+        )
+
+    def timestamp(self, frame_idx):
+        """フレームの表示時刻（ミリ秒）"""
+        return float(self.timestamps[frame_idx])
+
+    def nearest_keyframe(self, frame_idx):
+        """frame_idx以前で最も近いキーフレーム番号"""
+        if len(self.keyframes) == 0:
+            # キーフレーム情報がない場合はバックエンドのシークに任せる
+            return frame_idx
+        pos = np.searchsorted(self.keyframes, frame_idx, side="right") - 1
+        return int(self.keyframes[max(0, pos)])
+
+    def get_frame(self, frame_idx):
+        """RGBフレームを取得（キャッシュにない場合はシークしてデコード）"""
+        if frame_idx < 0:
+            frame_idx += self.frame_count
+        if not 0 <= frame_idx < self.frame_count:
+            raise IndexError(f"フレーム番号が範囲外です: {frame_idx}")
+
+        with self._lock:
+            cached = self._cache.get(frame_idx)
+            if cached is not None:
+                self._cache.move_to_end(frame_idx)
+                return cached
+
+            self._seek(frame_idx)
+            ret, frame = self._cap.read()
+            if not ret:
+                self._next_pos = -1  # 位置が不明なので次回は必ずシーク
+                raise IndexError(f"フレーム {frame_idx} をデコードできませんでした")
+            self._next_pos = frame_idx + 1
+
+            # BGRからRGBに変換
+            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            self._cache[frame_idx] = frame_rgb
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            return frame_rgb
+
+    def _seek(self, frame_idx):
+        """次の read() で frame_idx が得られるようにデコーダ位置を合わせる"""
+        if frame_idx == self._next_pos:
+            return
+
+        keyframe = self.nearest_keyframe(frame_idx)
+        # 同じGOP内で前方にある場合はシークせずにそのまま読み進める
+        if not (keyframe <= self._next_pos < frame_idx):
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, keyframe)
+            self._next_pos = keyframe
+
+        # 表示しないフレームは grab() のみ（色変換を省略）
+        while self._next_pos < frame_idx:
+            if not self._cap.grab():
+                break
+            self._next_pos += 1
+
+    def decode_range(
+        self,
+        start=0,
+        stop=None,
+        downsample=1,
+        max_workers=None,
+        progress_callback=None,
+        stop_event=None,
+    ):
+        """
+        キーフレームインデックスを使って範囲を並列デコードする（decode_segmented参照）
+
+        再生用のキャプチャとフレームキャッシュは使わないので、解析などで
+        動画全体を読む場合も再生を妨げない。
+        """
+        return decode_segmented(
+            self.file_path,
+            start,
+            self.frame_count if stop is None else stop,
+            keyframes=self.keyframes,
+            downsample=downsample,
+            max_workers=max_workers,
+            progress_callback=progress_callback,
+            stop_event=stop_event,
+        )
+
+    def iter_chunks(self, start=0, stop=None, chunk_size=16, stop_event=None):
+        """
+        フレームを chunk_size 枚ずつ順にデコードする（TiffLoader.iter_page_chunks の動画版）
+
+        専用のキャプチャで先頭へ1回だけシークして前方に読み進めるので、
+        再生用のキャプチャとフレームキャッシュは使わず、チャンクごとのシークも発生しない。
+
+        Args:
+            start: 先頭フレーム番号
+            stop: 終端フレーム番号（含まない）。Noneの場合は最後まで
+            chunk_size: 1回に返すフレーム数
+            stop_event: セットされるとデコードを中断するイベント
+
+        Yields:
+            tuple: (先頭フレーム番号, (枚数, H, W, 3) のRGB配列)
+        """
+        stop = self.frame_count if stop is None else min(stop, self.frame_count)
+        cap = cv2.VideoCapture(self.file_path)
+        try:
+            if not cap.isOpened():
+                raise IOError("OpenCVで動画ファイルを開けませんでした")
+            if start > 0:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+                if int(cap.get(cv2.CAP_PROP_POS_FRAMES)) != start:
+                    raise IOError(f"フレーム {start} へシークできませんでした")
+
+            for offset in range(start, stop, chunk_size):
+                if stop_event is not None and stop_event.is_set():
+                    return
+                chunk = np.empty(
+                    (min(chunk_size, stop - offset), self.height, self.width, 3),
+                    dtype=np.uint8,
+                )
+                for i in range(len(chunk)):
+                    ret, frame = cap.read()
+                    if not ret:
+                        raise IOError(
+                            f"フレーム {offset + i} をデコードできませんでした"
+                        )
+                    cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=chunk[i])
+                yield offset, chunk
+        finally:
+            cap.release()
+
+    def close(self):
+        """キャプチャとキャッシュを解放する"""
+        with self._lock:
+            self._cap.release()
+            self._cache.clear()
+            self.frame_count = 0
+
+
+def _segment_bounds(start, stop, num_segments, keyframes=None):
+    """[start, stop) をほぼ等分し、可能なら各境界をキーフレームに揃える"""
+    bounds = np.linspace(start, stop, num_segments + 1).astype(np.int64)
+    if keyframes is not None and len(keyframes) > 0:
+        # 境界を直前のキーフレームへ寄せるとシーク後のデコードが最小になる
+        inner = bounds[1:-1]
+        pos = np.searchsorted(keyframes, inner, side="right") - 1
+        snapped = np.where(pos >= 0, keyframes[np.maximum(pos, 0)], inner)
+        bounds[1:-1] = np.maximum(snapped, start)
+    bounds = np.unique(bounds)
+    return [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+
+def _decode_segment(
+    file_path, seg_start, seg_stop, out, offset, downsample, stop_event, tick
+):
+    """1セグメントを専用のVideoCaptureでデコードし out に直接書き込む"""
+    cap = cv2.VideoCapture(file_path)
+    try:
+        if not cap.isOpened():
+            raise IOError("OpenCVでファイルを開けませんでした")
+        if seg_start > 0:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, seg_start)
+            if int(cap.get(cv2.CAP_PROP_POS_FRAMES)) != seg_start:
+                raise IOError(f"フレーム {seg_start} へシークできませんでした")
+
+        for i in range(seg_start, seg_stop):
+            if stop_event is not None and stop_event.is_set():
+                return i - seg_start
+            ret, frame = cap.read()
+            if not ret:
+                return i - seg_start
+            if downsample > 1:
+                frame = frame[::downsample, ::downsample]
+            # BGRからRGBに変換し、確保済みバッファへ書き込む
+            cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=out[i - offset])
+            tick()
+        return seg_stop - seg_start
+    finally:
+        cap.release()
+
+
+def decode_segmented(
+    file_path,
+    start=0,
+    stop=None,
+    keyframes=None,
+    downsample=1,
+    max_workers=None,
+    progress_callback=None,
+    stop_event=None,
+):
+    """
+    フレーム範囲をセグメントに分割し、セグメントごとに別のVideoCaptureで並列デコードする
+
+    各ワーカーはセグメント先頭へシークしてから前方に読み進め、
+    結果は事前に確保した (N, H, W, 3) 配列の該当位置へ順序どおりに書き込まれる。
+
+    Args:
+        file_path: 動画ファイルのパス
+        start: 先頭フレーム番号
+        stop: 終端フレーム番号（含まない）。Noneの場合はコンテナのフレーム数
+        keyframes: キーフレーム番号の配列（セグメント境界の調整に使用）
+        downsample: 縦横の間引き間隔（解析用に縮小したフレームだけを保持する場合）
+        max_workers: 並列デコード数。Noneの場合はCPUコア数-1
+        progress_callback: 進捗を通知するコールバック関数 (引数: 進捗率0.0-1.0)
+        stop_event: セットされるとデコードを中断するイベント
+
+    Returns:
+        np.ndarray: RGBフレーム配列。途中で失敗した場合は連続してデコードできた先頭部分のみ。
+                    中断された場合は None
+    """
+    cap = cv2.VideoCapture(file_path)
+    try:
+        if not cap.isOpened():
+            raise IOError("OpenCVでファイルを開けませんでした")
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        if stop is None:
+            stop = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    finally:
+        cap.release()
+
+    total = max(0, stop - start)
+    height = len(range(0, height, downsample))
+    width = len(range(0, width, downsample))
+    out = np.empty((total, height, width, 3), dtype=np.uint8)
+    if total == 0:
+        return out
+
+    max_workers = max(1, max_workers if max_workers is not None else os.cpu_count() - 1)
+    # ワーカー数の倍に分割して、セグメント長の偏りを吸収する
+    segments = _segment_bounds(start, stop, max_workers * 2, keyframes)
+
+    counter = ProgressCounter(total, progress_callback, interval=10)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(
+                _decode_segment,
+                file_path,
+                a,
+                b,
+                out,
+                start,
+                downsample,
+                stop_event,
+                counter.add,
+            )
+            for a, b in segments
+        ]
+        decoded = [future.result() for future in futures]
+
+    if stop_event is not None and stop_event.is_set():
+        return None
+
+    # 途中で読めなくなったセグメントがあれば、連続している先頭部分だけを返す
+    for (a, b), count in zip(segments, decoded):
+        if count < b - a:
+            return out[: a - start + count]
+    return out